@@ -0,0 +1,219 @@
+import math
+import numpy as np
+from collections import deque
+from typing import *
+from BUSINESS.kernels import ema_kernel, stochrsi_kernel
+
+EPSILON = np.finfo(np.float64).eps
+
+
+class EmaState:
+    """EMA по формуле pandas_ta: затравка SMA по первым length значениям, далее alpha = 2 / (length + 1)."""
+
+    def __init__(self, length: int):
+        self.length = max(int(length), 1)
+        self.alpha = 2.0 / (self.length + 1)
+        self.count = 0
+        self.total = 0.0
+        self.value = math.nan
+
+    def peek(self, x: float) -> float:
+        count = self.count + 1
+        if count < self.length:
+            return math.nan
+        if count == self.length:
+            return (self.total + x) / self.length
+        return self.value + self.alpha * (x - self.value)
+
+    def update(self, x: float) -> float:
+        value = self.peek(x)
+        self.count += 1
+        if self.count <= self.length:
+            self.total += x
+        self.value = value
+        return value
+
+    def seed(self, values: np.ndarray) -> None:
+        out = ema_kernel(values, self.length)
+        self.count = len(values)
+        self.total = float(values[:self.length].sum())
+        self.value = float(out[-1]) if len(out) else math.nan
+
+
+class RsiState:
+    """RSI по формуле rma pandas_ta (ewm adjust=True): взвешенные суммы приростов и потерь с затуханием 1 - 1 / length."""
+
+    def __init__(self, length: int = 14):
+        self.length = max(int(length), 1)
+        self.decay = 1.0 - 1.0 / self.length
+        self.prev_close: Optional[float] = None
+        self.count = 0      # число приращений
+        self.gain_sum = 0.0
+        self.loss_sum = 0.0
+
+    def _next(self, close: float) -> Tuple[float, float, float]:
+        diff = close - self.prev_close
+        gain = self.decay * self.gain_sum + max(diff, 0.0)
+        loss = self.decay * self.loss_sum + max(-diff, 0.0)
+        if self.count + 1 < self.length or not gain + loss:
+            return gain, loss, math.nan
+        return gain, loss, 100.0 * gain / (gain + loss)
+
+    def peek(self, close: float) -> float:
+        if self.prev_close is None:
+            return math.nan
+        return self._next(close)[2]
+
+    def update(self, close: float) -> float:
+        if self.prev_close is None:
+            self.prev_close = close
+            return math.nan
+        self.gain_sum, self.loss_sum, value = self._next(close)
+        self.prev_close = close
+        self.count += 1
+        return value
+
+    def seed_state(self, close: np.ndarray, gain_sum: float, loss_sum: float) -> None:
+        """Состояние после прохода ядром по close (суммы -- из rsi_kernel)."""
+        if not len(close):
+            return
+        self.prev_close = float(close[-1])
+        self.count = len(close) - 1
+        self.gain_sum, self.loss_sum = float(gain_sum), float(loss_sum)
+
+
+class RollingWindow:
+    """Последние size значений; NaN внутри окна даёт NaN (как rolling с min_periods=size)."""
+
+    def __init__(self, size: int):
+        self.size = max(int(size), 1)
+        self.values: deque = deque(maxlen=self.size)
+
+    def window(self, x: Optional[float] = None) -> Optional[np.ndarray]:
+        """Окно после добавления x (без записи); None, пока окно не заполнено."""
+        values = list(self.values)
+        if x is not None:
+            values = values[1:] + [x] if len(values) == self.size else values + [x]
+        if len(values) < self.size:
+            return None
+        return np.asarray(values, dtype=np.float64)
+
+    def append(self, x: float) -> None:
+        self.values.append(x)
+
+    def seed(self, values: np.ndarray) -> None:
+        self.values.extend(float(x) for x in values[-self.size:])
+
+    def mean(self, x: Optional[float] = None) -> float:
+        window = self.window(x)
+        return math.nan if window is None else float(window.mean())
+
+
+class TrendEmaState:
+    """Пара EMA для TREND_EMA: 1 / -1 по знаку ema1 - ema2 (0, пока EMA не определены)."""
+
+    def __init__(self, period1: int, period2: int, is_trend: int = 1):
+        self.fast = EmaState(period1)
+        self.slow = EmaState(period2)
+        self.is_trend = is_trend
+
+    def _signal(self, fast: float, slow: float) -> int:
+        if fast > slow:
+            return self.is_trend
+        if fast < slow:
+            return -self.is_trend
+        return 0
+
+    def peek(self, x: float) -> int:
+        return self._signal(self.fast.peek(x), self.slow.peek(x))
+
+    def update(self, x: float) -> int:
+        return self._signal(self.fast.update(x), self.slow.update(x))
+
+    def seed(self, values: np.ndarray) -> None:
+        self.fast.seed(values)
+        self.slow.seed(values)
+
+
+class StochRsiState:
+    """
+    StochRSI по формуле ta.stochrsi(close, length, k, d): RSI(rsi_length) -> min/max за length
+    -> %K = SMA(k) от stoch, %D = SMA(d) от %K.
+    """
+
+    def __init__(self, length: int, k: int, d: int, rsi_length: int = 14):
+        self.params = (max(int(length), 1), max(int(k), 1), max(int(d), 1), max(int(rsi_length), 1))
+        self.rsi = RsiState(rsi_length)
+        self.rsi_window = RollingWindow(length)
+        self.stoch_window = RollingWindow(k)
+        self.k_window = RollingWindow(d)
+
+    def _stoch(self, rsi_value: float) -> float:
+        window = self.rsi_window.window(rsi_value)
+        if window is None:
+            return math.nan
+        lowest, highest = window.min(), window.max()
+        spread = highest - lowest
+        return float(100.0 * (rsi_value - lowest) / (spread if spread else EPSILON))
+
+    def peek(self, close: float) -> Tuple[float, float]:
+        stoch = self._stoch(self.rsi.peek(close))
+        k_value = self.stoch_window.mean(stoch)
+        return k_value, self.k_window.mean(k_value)
+
+    def update(self, close: float) -> Tuple[float, float]:
+        rsi_value = self.rsi.update(close)
+        stoch = self._stoch(rsi_value)
+        self.rsi_window.append(rsi_value)
+        k_value = self.stoch_window.mean(stoch)
+        self.stoch_window.append(stoch)
+        d_value = self.k_window.mean(k_value)
+        self.k_window.append(k_value)
+        return k_value, d_value
+
+    def seed(self, close: np.ndarray) -> None:
+        rsi, stoch, k_values, _, gain_sum, loss_sum = stochrsi_kernel(close, *self.params)
+        self.rsi.seed_state(close, gain_sum, loss_sum)
+        self.rsi_window.seed(rsi)
+        self.stoch_window.seed(stoch)
+        self.k_window.seed(k_values)
+
+
+class IndicatorStreams:
+    """
+    Инкрементальные индикаторы (режим INDICATORS_STREAMING, по умолчанию выключен): состояние на
+    (symbol_tfr, индикатор, параметры), только TREND_EMA и STOCHRSI; VOLF берёт последние period + 2 бара
+    и считается по окну. История копится с момента старта, поэтому EMA и RSI отличаются от пересчёта
+    по окну кеша -- определения с ограниченной историей, совпадающего с окном, пока нет.
+    Закрытые бары фиксируются в состоянии один раз, последний (возможно, незакрытый) бар
+    считается предпросмотром без записи. Первое обращение или разрыв истории -- затравка
+    по всему окну numba-ядрами (BUSINESS.kernels).
+    """
+
+    def __init__(self):
+        self.streams: Dict[tuple, list] = {}    # key -> [state, время последнего закрытого бара]
+
+    def advance(self, key: Optional[tuple], factory: Callable, times: np.ndarray, values: np.ndarray):
+        """Доводит состояние до предпоследнего бара и возвращает (state, peek последнего бара)."""
+        closed_times = times[:-1]
+        entry = self.streams.get(key) if key is not None else None
+        start = None
+        if entry is not None and entry[1] is not None and len(closed_times):
+            pos = int(np.searchsorted(closed_times, entry[1], side="right"))
+            if pos and closed_times[pos - 1] == entry[1]:
+                start = pos
+
+        if start is None:
+            state = factory()
+            state.seed(np.ascontiguousarray(values[:-1], dtype=np.float64))
+            entry = [state, None]
+            if key is not None:
+                self.streams[key] = entry
+        else:
+            state = entry[0]
+            for x in values[start:-1]:
+                state.update(float(x))
+        if len(closed_times):
+            entry[1] = closed_times[-1]
+        return state, state.peek(float(values[-1]))
+
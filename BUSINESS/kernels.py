@@ -0,0 +1,121 @@
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True)
+def ema_kernel(values, length):
+    """EMA по формуле pandas_ta: SMA первых length значений, далее alpha = 2 / (length + 1)."""
+    n = len(values)
+    out = np.full(n, np.nan)
+    if length < 1 or n < length:
+        return out
+    alpha = 2.0 / (length + 1)
+    value = values[:length].sum() / length
+    out[length - 1] = value
+    for i in range(length, n):
+        value = value + alpha * (values[i] - value)
+        out[i] = value
+    return out
+
+
+@njit(cache=True)
+def rsi_kernel(close, length):
+    """
+    RSI по формуле pandas_ta: rma = ewm(alpha=1/length, min_periods=length) с adjust=True.
+    Нормировка весов у приростов и потерь общая и в отношении сокращается, поэтому
+    достаточно взвешенных сумм. Возвращает (rsi, сумма приростов, сумма потерь).
+    """
+    n = len(close)
+    out = np.full(n, np.nan)
+    decay = 1.0 - 1.0 / length
+    gain_sum = 0.0
+    loss_sum = 0.0
+    for i in range(1, n):
+        diff = close[i] - close[i - 1]
+        gain_sum = decay * gain_sum + (diff if diff > 0 else 0.0)
+        loss_sum = decay * loss_sum + (-diff if diff < 0 else 0.0)
+        if i >= length and gain_sum + loss_sum:
+            out[i] = 100.0 * gain_sum / (gain_sum + loss_sum)
+    return out, gain_sum, loss_sum
+
+
+@njit(cache=True)
+def rolling_max_kernel(values, window):
+    """Скользящий максимум; NaN в окне или неполное окно -- NaN."""
+    n = len(values)
+    out = np.full(n, np.nan)
+    for i in range(window - 1, n):
+        out[i] = values[i - window + 1:i + 1].max()
+    return out
+
+
+@njit(cache=True)
+def rolling_min_kernel(values, window):
+    n = len(values)
+    out = np.full(n, np.nan)
+    for i in range(window - 1, n):
+        out[i] = values[i - window + 1:i + 1].min()
+    return out
+
+
+@njit(cache=True)
+def rolling_mean_kernel(values, window):
+    n = len(values)
+    out = np.full(n, np.nan)
+    for i in range(window - 1, n):
+        out[i] = values[i - window + 1:i + 1].sum() / window
+    return out
+
+
+@njit(cache=True)
+def stochrsi_kernel(close, length, k, d, rsi_length):
+    """StochRSI по формуле ta.stochrsi: возвращает (rsi, stoch, %K, %D, сумма приростов, сумма потерь)."""
+    rsi, gain_sum, loss_sum = rsi_kernel(close, rsi_length)
+    lowest = rolling_min_kernel(rsi, length)
+    highest = rolling_max_kernel(rsi, length)
+    spread = highest - lowest
+    eps = np.finfo(np.float64).eps
+    for i in range(len(spread)):
+        if spread[i] == 0:
+            spread[i] = eps
+    stoch = 100.0 * (rsi - lowest) / spread
+    k_values = rolling_mean_kernel(stoch, k)
+    d_values = rolling_mean_kernel(k_values, d)
+    return rsi, stoch, k_values, d_values, gain_sum, loss_sum
+
+
+@njit(cache=True)
+def trend_ema_panel_kernel(values, period1, period2):
+    """Панель symbols x bars: последние значения быстрой и медленной EMA по каждой строке."""
+    rows = values.shape[0]
+    fast = np.full(rows, np.nan)
+    slow = np.full(rows, np.nan)
+    for r in range(rows):
+        fast[r] = values[r, -1] if period1 == 1 else ema_kernel(values[r], period1)[-1]
+        slow[r] = ema_kernel(values[r], period2)[-1]
+    return fast, slow
+
+
+@njit(cache=True)
+def stochrsi_panel_kernel(close, length, k, d, rsi_length):
+    """Панель symbols x bars: последние %K и %D StochRSI по каждой строке."""
+    rows = close.shape[0]
+    k_last = np.full(rows, np.nan)
+    d_last = np.full(rows, np.nan)
+    for r in range(rows):
+        _, _, k_values, d_values, _, _ = stochrsi_kernel(close[r], length, k, d, rsi_length)
+        k_last[r] = k_values[-1]
+        d_last[r] = d_values[-1]
+    return k_last, d_last
+
+
+def warmup_kernels() -> None:
+    """Компиляция (или загрузка из кеша numba) до первого сигнала."""
+    sample = np.linspace(1.0, 2.0, 64)
+    ema_kernel(sample, 5)
+    rolling_max_kernel(sample, 5)
+    rolling_mean_kernel(sample, 5)
+    stochrsi_kernel(sample, 14, 3, 3, 14)
+    panel = np.vstack((sample, sample))
+    trend_ema_panel_kernel(panel, 1, 5)
+    stochrsi_panel_kernel(panel, 14, 3, 3, 14)
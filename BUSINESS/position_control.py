@@ -121,10 +121,12 @@ class PositionCleaner():
 
         # ♻️ Переинициализация текущей позиции
         symbol_data = self.context.position_vars[user_name][strategy_name].setdefault(symbol, {})
-        self.set_pos_defaults(symbol_data, symbol, position_side)
+        self.set_pos_defaults(symbol_data, symbol, position_side, user_name, strategy_name)
 
         # 🧹 Обнуляем current price
-        self.context.ws_price_data[symbol] = {"close": None}
+        price_data = self.context.ws_price_data.setdefault(symbol, {})
+        price_data.clear()
+        price_data["close"] = None
 
         # 🧼 Глобальный сброс symbols_prison для всех позиций данной стратегии данного юзера
         self.reset_symbols_prison(self.context.position_vars[user_name][strategy_name])
@@ -283,7 +285,12 @@ class PositionsUpdater(PositionCleaner):
                             in_position = symbol_data.get("in_position")
                             cur_time_struc = symbol_data.get("c_time")
                             notional_struc = symbol_data.get("notional")
-                            
+                            is_changed = (
+                                not in_position
+                                or symbol_data.get("avg_price") != entry_price
+                                or symbol_data.get("comul_qty") != position_amt
+                            )
+
                             symbol_data.update({
                                 "in_position": True,
                                 "comul_qty": position_amt,
@@ -292,6 +299,9 @@ class PositionsUpdater(PositionCleaner):
                                 "avg_price": entry_price,
                                 "c_time": cur_time if not in_position else cur_time_struc,
                             })
+                            if is_changed:
+                                self.context.publish_event("position", user_name, symbol)
+                                self.context.notify_position(user_name, strategy_name, symbol, position_side)
 
                 if is_partly_closed:                 
                     # Основной запрос на маркет-ордер
@@ -330,6 +340,8 @@ class PositionsUpdater(PositionCleaner):
                         )
                         # Затем очищаем кеш контроля позиций
                         self.reset_position_vars(user_name, strategy_name, symbol, position_side)
+                        self.context.publish_event("position", user_name, symbol)
+                        self.context.notify_position(user_name, strategy_name, symbol, position_side)
 
             self.context.first_update_done[user_name] = True
             # print("jdjdjdj")
@@ -340,6 +352,33 @@ class PositionsUpdater(PositionCleaner):
             self.error_handler.debug_error_notes(f"{debug_label}[Unexpected Error] Failed to update positions for {strategy_name}: {e}")
             return        
 
+    async def apply_positions_update(
+        self,
+        session: aiohttp.ClientSession,
+        user_name: str,
+        positions: List[Dict],
+        cancel_order_by_id: Callable,
+        cancel_all_risk_orders: Callable,
+        get_realized_pnl: Callable,
+        make_order: Callable
+    ) -> None:
+        """Применяет список позиций (REST-снимок или ACCOUNT_UPDATE) ко всем стратегиям пользователя."""
+        # Параллельная обработка всех стратегий пользователя
+        await asyncio.gather(*[
+            self.update_positions(
+                session,
+                user_name,
+                strategy_name,
+                strategy_details.get("symbols", set()),
+                positions,
+                cancel_order_by_id,
+                cancel_all_risk_orders,
+                get_realized_pnl,
+                make_order
+            )
+            for strategy_name, strategy_details in self.context.total_settings[user_name].get("strategies_symbols", {}).items()
+        ])
+
     async def refresh_positions_state(
         self,
         session: aiohttp.ClientSession,
@@ -364,21 +403,15 @@ class PositionsUpdater(PositionCleaner):
             if not positions:
                 return            
 
-            # Параллельная обработка всех стратегий пользователя
-            await asyncio.gather(*[
-                self.update_positions(
-                    session,
-                    user_name,
-                    strategy_name,
-                    strategy_details.get("symbols", set()),
-                    positions,
-                    cancel_order_by_id,
-                    cancel_all_risk_orders,
-                    get_realized_pnl,
-                    make_order
-                )
-                for strategy_name, strategy_details in self.context.total_settings[user_name].get("strategies_symbols", {}).items()
-            ])
+            await self.apply_positions_update(
+                session,
+                user_name,
+                positions,
+                cancel_order_by_id,
+                cancel_all_risk_orders,
+                get_realized_pnl,
+                make_order
+            )
 
         except aiohttp.ClientError as e:
             self.error_handler.debug_error_notes(f"{debug_label}[HTTP Error] Failed to fetch positions: {e}. ")
@@ -398,7 +431,8 @@ class Sync(PositionsUpdater):
         cancel_all_risk_orders: Callable,   
         preform_message: Callable,  
         use_cache: bool,
-        positions_update_frequency: int = 1
+        positions_update_frequency: int = 1,
+        reconcile_interval: float = 60.0
     ):
         super().__init__(
             context,
@@ -413,6 +447,64 @@ class Sync(PositionsUpdater):
         self.write_cache = write_cache
         self._pos_lock = asyncio.Lock()        
 
+        # при живом user-data stream REST-сверка идёт редко: по интервалу или после переподключения
+        self.reconcile_interval = reconcile_interval
+        self.is_user_stream_alive: Callable[[str], bool] = lambda user_name: False
+        self.reconcile_requested: Set[str] = set()
+        self.last_reconcile_time: Dict[str, float] = {}
+        self.user_locks: Dict[str, asyncio.Lock] = {}
+
+    def user_lock(self, user_name: str) -> asyncio.Lock:
+        """REST-сверка и события стрима одного пользователя применяются строго по очереди."""
+        return self.user_locks.setdefault(user_name, asyncio.Lock())
+
+    def request_reconcile(self, user_name: str) -> None:
+        self.reconcile_requested.add(user_name)
+
+    def is_reconcile_due(self, user_name: str, now: float) -> bool:
+        if not self.is_user_stream_alive(user_name):
+            return True  # стрима нет -- обычный REST-опрос
+        if user_name in self.reconcile_requested:
+            return True
+        return now - self.last_reconcile_time.get(user_name, 0.0) >= self.reconcile_interval
+
+    async def apply_user_data_event(self, user_name: str, event: dict) -> None:
+        """Применяет событие user-data stream к position_vars."""
+        event_type = event.get("e")
+
+        if event_type == "ACCOUNT_UPDATE":
+            positions = []
+            for pos in event.get("a", {}).get("P", []):
+                position_amt = float(pos.get("pa", 0.0))
+                entry_price = float(pos.get("ep", 0.0))
+                positions.append({
+                    "symbol": pos.get("s", ""),
+                    "positionSide": pos.get("ps", ""),
+                    "positionAmt": position_amt,
+                    "entryPrice": entry_price,
+                    "notional": abs(position_amt) * entry_price,  # в событии нет notional -- оцениваем по цене входа
+                })
+            if not positions:
+                return
+
+            connector: NetworkManager = self.context.user_contexts[user_name]["connector"]
+            binance_client: BinancePrivateApi = self.context.user_contexts[user_name]["binance_client"]
+            async with self.user_lock(user_name):
+                await self.apply_positions_update(
+                    connector.session,
+                    user_name,
+                    positions,
+                    binance_client.cancel_order_by_id,
+                    self.cancel_all_risk_orders,
+                    binance_client.get_realized_pnl,
+                    binance_client.make_order
+                )
+
+        elif event_type == "ORDER_TRADE_UPDATE":
+            order = event.get("o", {})
+            if order.get("X") in ("FILLED", "PARTIALLY_FILLED"):
+                self.context.publish_event("position", user_name, order.get("s"))
+
     def sync_cache_with_positions(self, user_name):
         """Merge cached values into existing context.position_vars in-place."""
         user_cache = self.loaded_cache.get(user_name)
@@ -431,26 +523,40 @@ class Sync(PositionsUpdater):
                 if not isinstance(cached_data, dict):
                     continue
 
-                if symbol in strategy_positions and isinstance(strategy_positions[symbol], dict):
-                    strategy_positions[symbol].update(copy.deepcopy(cached_data))
+                cached_data = copy.deepcopy(cached_data)
+                symbol_data = strategy_positions.get(symbol)
+                if isinstance(symbol_data, dict):
+                    # вложенные словари сторон обновляем на месте -- они привязаны к positions_registry
+                    for key, value in cached_data.items():
+                        if key in ("LONG", "SHORT") and isinstance(value, dict) and isinstance(symbol_data.get(key), dict):
+                            symbol_data[key].update(value)
+                        elif key == "martin" and isinstance(value, dict) and isinstance(symbol_data.get(key), dict):
+                            for side, side_data in value.items():
+                                symbol_data[key].setdefault(side, {}).update(side_data)
+                        else:
+                            symbol_data[key] = value
                 else:
                     # создаём новый dict (копия)
-                    strategy_positions[symbol] = copy.deepcopy(cached_data)
+                    symbol_data = strategy_positions[symbol] = cached_data
+                self.context.positions_registry.bind(symbol_data, user_name, strategy_name, symbol)
 
     async def sync_pos_all_users(self, user_name: str):
         # print("sync_pos_all_users1")
         connector: NetworkManager = self.context.user_contexts[user_name]["connector"]
         binance_client: BinancePrivateApi = self.context.user_contexts[user_name]["binance_client"]       
 
-        await self.refresh_positions_state(
-            session=connector.session,
-            user_name=user_name,
-            fetch_positions=binance_client.fetch_positions,
-            cancel_order_by_id=binance_client.cancel_order_by_id,
-            cancel_all_risk_orders=self.cancel_all_risk_orders,
-            get_realized_pnl=binance_client.get_realized_pnl,
-            make_order=binance_client.make_order
-        )   
+        self.reconcile_requested.discard(user_name)
+        self.last_reconcile_time[user_name] = time.monotonic()
+        async with self.user_lock(user_name):
+            await self.refresh_positions_state(
+                session=connector.session,
+                user_name=user_name,
+                fetch_positions=binance_client.fetch_positions,
+                cancel_order_by_id=binance_client.cancel_order_by_id,
+                cancel_all_risk_orders=self.cancel_all_risk_orders,
+                get_realized_pnl=binance_client.get_realized_pnl,
+                make_order=binance_client.make_order
+            )   
 
     async def positions_flow_manager(self):
         """Цикл обновления позиций и синхронизации кэша"""
@@ -472,7 +578,8 @@ class Sync(PositionsUpdater):
             await asyncio.sleep(self.positions_update_frequency)
 
             try:
-                await asyncio.gather(*[self.sync_pos_all_users(user_name) for user_name in all_users])
+                due_users = [user_name for user_name in all_users if self.is_reconcile_due(user_name, time.monotonic())]
+                await asyncio.gather(*[self.sync_pos_all_users(user_name) for user_name in due_users])
             except Exception as e:
                 print(f"[SYNC][ERROR] refresh_positions_state: {e}")
 
@@ -1,5 +1,6 @@
 import aiohttp
-from typing import Dict, Tuple, Callable, Optional
+import numpy as np
+from typing import Dict, List, Set, Tuple, Callable, Optional
 from b_context import BotContext
 from c_log import ErrorHandler, log_time
 from c_utils import PositionUtils
@@ -422,6 +423,124 @@ class RiskOrdersControl:
             error_handler=error_handler
         )
 
+        # статические пороги по строкам positions_registry (пересобираются при появлении новых строк)
+        self.risk_tables: Optional[dict] = None
+
+    def build_risk_tables(self) -> dict:
+        """Раскладывает настройки TP/SL/трейлинга/сетки усреднения по строкам positions_registry."""
+        registry = self.context.positions_registry
+        n = registry.size
+        sign = np.where(registry.is_long[:n], 1.0, -1.0)
+        tp = np.full(n, np.nan)
+        sl = np.full(n, np.nan)
+        grid_rows: List[List[float]] = []
+        trailing_rows: List[List[float]] = []
+        user_symbol_rows: Dict[Tuple[str, str], List[int]] = {}
+
+        for row, (user_name, strategy_name, symbol, position_side) in enumerate(registry.keys[:n]):
+            user_symbol_rows.setdefault((user_name, symbol), []).append(row)
+            symbols_risk = self.context.total_settings.get(user_name, {}).get("symbols_risk", {})
+            key_symb = "ANY_COINS" if symbol not in symbols_risk else symbol
+            sbl_risk = symbols_risk.get(key_symb, {})
+            if sbl_risk.get("fallback_tp") is not None:
+                tp[row] = sbl_risk["fallback_tp"]
+            if sbl_risk.get("sl") is not None:
+                sl[row] = sbl_risk["sl"]
+
+            settings_pos_options = self.context.strategy_notes.get(strategy_name, {}).get(position_side, {})
+            grid_orders = settings_pos_options.get("entry_conditions", {}).get("grid_orders") or []
+            grid_rows.append([-abs(step.get("indent", 0.0)) for step in grid_orders])
+            trailing_settings = settings_pos_options.get("exit_conditions", {}).get("trailing_sl", {})
+            trailing_sl = trailing_settings.get("val", []) if trailing_settings.get("enable", False) else []
+            trailing_rows.append([step.get("activation_indent", 0.0) for step in trailing_sl])
+
+        def pad(rows: List[List[float]]) -> Tuple[np.ndarray, np.ndarray]:
+            lens = np.array([len(r) for r in rows], dtype=np.int64)
+            table = np.full((n, max(int(lens.max()) if n else 0, 1)), np.nan)
+            for row, values in enumerate(rows):
+                table[row, :len(values)] = values
+            return table, lens
+
+        grid_indents, grid_lens = pad(grid_rows)
+        trailing_activations, trailing_lens = pad(trailing_rows)
+        self.risk_tables = {
+            "size": n, "sign": sign, "tp": tp, "sl": sl,
+            "grid_indents": grid_indents, "grid_lens": grid_lens,
+            "trailing_activations": trailing_activations, "trailing_lens": trailing_lens,
+            "user_symbol_rows": user_symbol_rows,
+        }
+        return self.risk_tables
+
+    def batch_risk_masks(self) -> Dict[str, np.ndarray]:
+        """
+        Один векторный проход по всем позициям реестра.
+        Маски tp_hit / sl_hit / trailing_advance / avg_trigger повторяют условия TP, SL, TrailingSL и Average
+        (без учёта сигнала на усреднение -- его проверяет risk_symbol_monitoring).
+        """
+        registry = self.context.positions_registry
+        n = registry.size
+        tables = self.risk_tables
+        if tables is None or tables["size"] != n:
+            tables = self.build_risk_tables()
+
+        # динамические TP/SL фильтра перекрывают статические
+        tp, sl = tables["tp"], tables["sl"]
+        if self.context.dinamik_risk_data:
+            tp, sl = tp.copy(), sl.copy()
+            for user_name, symbols_data in self.context.dinamik_risk_data.items():
+                for symbol, risk_data in symbols_data.items():
+                    rows = tables["user_symbol_rows"].get((user_name, symbol))
+                    if not rows:
+                        continue
+                    if risk_data.get("tp") is not None:
+                        tp[rows] = risk_data["tp"]
+                    if risk_data.get("sl") is not None:
+                        sl[rows] = risk_data["sl"]
+
+        cur_price = registry.prices(self.context.ws_price_data)
+        avg_price = registry.columns["avg_price"][:n]
+        entry_price = registry.columns["entry_price"][:n]
+        sign = tables["sign"]
+        all_rows = np.arange(n)
+
+        trailing_counter = np.nan_to_num(registry.columns["trailing_sl_progress_counter"][:n], nan=0.0).astype(np.int64)
+        avg_counter = np.nan_to_num(registry.columns["avg_progress_counter"][:n], nan=1.0).astype(np.int64)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            is_open = registry.in_position[:n] & (cur_price > 0) & (avg_price > 0)
+            signed_nPnl = (cur_price - avg_price) / avg_price * 100 * sign
+
+            tp_hit = is_open & (signed_nPnl >= tp)
+            sl_hit = is_open & (trailing_counter <= 0) & (signed_nPnl <= sl)
+
+            trailing_width = tables["trailing_activations"].shape[1]
+            activation = tables["trailing_activations"][all_rows, np.clip(trailing_counter, 0, trailing_width - 1)]
+            trailing_advance = is_open & (trailing_counter < tables["trailing_lens"]) & (signed_nPnl >= activation)
+
+            grid_width = tables["grid_indents"].shape[1]
+            indent = tables["grid_indents"][all_rows, np.clip(avg_counter, 0, grid_width - 1)]
+            avg_nPnl = (cur_price - entry_price) / entry_price * 100 * sign
+            avg_trigger = (
+                is_open & (entry_price > 0) & (avg_counter >= 0)
+                & (tables["grid_lens"] > 1) & (avg_counter < tables["grid_lens"])
+                & (avg_nPnl <= indent)
+            )
+
+        return {
+            "nPnl": signed_nPnl,
+            "tp_hit": tp_hit,
+            "sl_hit": sl_hit,
+            "trailing_advance": trailing_advance,
+            "avg_trigger": avg_trigger,
+        }
+
+    def risk_candidates(self) -> Set[Tuple[str, str, str, str]]:
+        """Позиции (user_name, strategy_name, symbol, side), по которым сработала хотя бы одна маска риска."""
+        masks = self.batch_risk_masks()
+        hit = masks["tp_hit"] | masks["sl_hit"] | masks["trailing_advance"] | masks["avg_trigger"]
+        keys = self.context.positions_registry.keys
+        return {keys[row] for row in np.flatnonzero(hit)}
+
     def risk_symbol_monitoring(
         self,
         user_name: str,
@@ -2,14 +2,16 @@ import warnings
 warnings.filterwarnings("ignore", category=UserWarning)
 
 import pandas as pd
-import pandas_ta as ta
 import re
 import numpy as np
 from typing import *
 from numba import njit
+from a_settings import INDICATORS_STREAMING
 from c_initializer import BotContext
 from c_log import ErrorHandler
 from c_validators import TimeframeValidator, validate_dataframe
+from BUSINESS.indicator_states import IndicatorStreams, TrendEmaState, StochRsiState
+from BUSINESS.kernels import trend_ema_panel_kernel, stochrsi_panel_kernel
 import traceback
 
 
@@ -18,6 +20,14 @@ def extract_signal_func_name(strategy_name: str) -> str:
     match = re.match(r"^([a-zA-Z]_+)", strategy_name)
     return match.group(1).lower() if match else strategy_name.lower()
 
+def freeze_params(params) -> Hashable:
+    """Хешируемый снимок параметров индикатора (вложенные dict/list -> кортежи)."""
+    if isinstance(params, dict):
+        return tuple(sorted((str(key), freeze_params(value)) for key, value in params.items()))
+    if isinstance(params, (list, tuple, set)):
+        return tuple(freeze_params(value) for value in params)
+    return params
+
 @njit
 def filter_signals(signals):
     result = np.zeros_like(signals)
@@ -44,13 +54,29 @@ class INDICATORS:
     def __init__(
             self,
             context: BotContext, 
-            error_handler: ErrorHandler
+            error_handler: ErrorHandler,
+            streaming: bool = INDICATORS_STREAMING
         ):
         error_handler.wrap_foreign_methods(self)
         self.error_handler = error_handler
         self.context = context
-
-    def trend_ema_calc(self, df, ind_rules):
+        # True -- TREND_EMA/STOCHRSI ведут состояние с момента старта (см. INDICATORS_STREAMING),
+        # False -- пересчёт строго по окну кеша
+        self.streaming = streaming
+        self.streams = IndicatorStreams()
+
+    @staticmethod
+    def panel_row(df: pd.DataFrame, column: str) -> np.ndarray:
+        """Колонка df как панель из одной строки (1 x bars)."""
+        return np.ascontiguousarray(df[column].to_numpy(dtype=np.float64))[None, :]
+
+    def stream_values(self, df, column, stream_key, params, factory):
+        """Состояние индикатора, доведённое до последнего бара df, и значение на последнем баре."""
+        key = (stream_key, *params) if stream_key else None
+        times = df.index.asi8 if isinstance(df.index, pd.DatetimeIndex) else np.arange(len(df), dtype=np.int64)
+        return self.streams.advance(key, factory, times, df[column].to_numpy(dtype=np.float64))
+
+    def trend_ema_calc(self, df, ind_rules, stream_key=None):
         empty_signals = pd.Series([0] * len(df), index=df.index, name="TREND_EMA", dtype=int)
         try:
             enable = ind_rules['enable']
@@ -76,23 +102,25 @@ class INDICATORS:
                 )
                 raise ValueError("period1 не может быть больше или равен period2")
 
-            # Если период == 1, используем оригинальные значения
-            ema1 = df[col_name] if period1 == 1 else ta.ema(df[col_name], length=period1)
-            ema2 = ta.ema(df[col_name], length=period2)
-
-            signals = np.select(
-                condlist=[ema1 > ema2, ema1 < ema2],
-                choicelist=[1 * is_trend, -1 * is_trend],
-                default=0
-            )
+            if self.streaming:
+                _, signal = self.stream_values(
+                    df, col_name, stream_key, ("TREND_EMA", col_name, period1, period2, is_trend),
+                    lambda: TrendEmaState(period1, period2, is_trend)
+                )
+            else:
+                # тот же расчёт, что и в панели (одна строка панели)
+                result = self.trend_ema_panel({col_name: self.panel_row(df, col_name)}, ind_rules)
+                if result is None:
+                    return empty_signals
+                signal = result[0][0]
 
-            return pd.Series(signals, index=df.index, name="TREND_EMA", dtype=int)
+            return pd.Series([signal], index=df.index[-1:], name="TREND_EMA", dtype=int)
 
         except Exception as ex:
             self.error_handler.debug_info_notes(f"[ERROR][TREND_EMA] Исключение: {ex}", important=True)
             return empty_signals    
                 
-    def stochrsi_calc(self, df, ind_rules):
+    def stochrsi_calc(self, df, ind_rules, stream_key=None):
         empty_signals = pd.Series([0] * len(df), index=df.index, name="STOCHRSI", dtype=int)
         try:
             enable = ind_rules['enable']
@@ -112,26 +140,30 @@ class INDICATORS:
                 # )
                 return empty_signals
 
-            stochrsi_df = ta.stochrsi(df['Close'], length=period, k=k, d=d)
-            k_series = stochrsi_df.iloc[:, 0]
-            d_series = stochrsi_df.iloc[:, 1]
-
-            signals_val = np.select(
-                condlist=[
-                    (k_series <= over_sell) & (d_series <= over_sell),
-                    (k_series >= over_buy) & (d_series >= over_buy)
-                ],
-                choicelist=[1, -1],
-                default=0
+            if not self.streaming:
+                # тот же расчёт, что и в панели (одна строка панели)
+                result = self.stochrsi_panel({"Close": self.panel_row(df, 'Close')}, ind_rules)
+                if result is None:
+                    return empty_signals
+                return pd.Series([result[0][0]], index=df.index[-1:], name="STOCHRSI", dtype=int)
+
+            _, (k_value, d_value) = self.stream_values(
+                df, 'Close', stream_key, ("STOCHRSI", period, k, d),
+                lambda: StochRsiState(period, k, d)
             )
+            signal = 0
+            if k_value <= over_sell and d_value <= over_sell:
+                signal = 1
+            elif k_value >= over_buy and d_value >= over_buy:
+                signal = -1
 
-            return pd.Series(signals_val, index=df.index, name="STOCHRSI", dtype=int)
+            return pd.Series([signal], index=df.index[-1:], name="STOCHRSI", dtype=int)
 
         except Exception as ex:
             self.error_handler.debug_info_notes(f"[ERROR][STOCHRSI] Исключение: {ex}", important=True)
             return empty_signals
 
-    def volf_calc(self, df: pd.DataFrame, ind_rules: dict) -> pd.Series:
+    def volf_calc(self, df: pd.DataFrame, ind_rules: dict, stream_key=None) -> pd.Series:
         """
         """        
         try:
@@ -150,7 +182,7 @@ class INDICATORS:
                 self.error_handler.debug_error_notes(f"volf_calc: некорректный period = {period}")
                 return signals
 
-            if len(df) < period + 1:
+            if len(df) < period + 2:
                 self.error_handler.debug_error_notes("volf_calc: недостаточно данных для расчёта.")
                 return signals
 
@@ -159,31 +191,67 @@ class INDICATORS:
                 self.error_handler.debug_error_notes(f"volf_calc: неизвестный режим '{mode}'")
                 return signals
 
-            slice_factor = ind_rules.get(mode, {}).get('slice_factor', 1.0)
-            volume = df['Volume'].abs()
-            last_vol = volume.iloc[-1]
-
-            # Берём предыдущие period баров (исключая последний)
-            ref_values = volume.iloc[-(period + 1):-1]
-
-            if mode == 'a':
-                past_max = ref_values.max()
-                # print(f"past_max: {past_max}")
-                if pd.notna(past_max) and last_vol > past_max * slice_factor:
-                    signals.iloc[-1] = True
-
-            elif mode == 'r':
-                past_avg = ref_values.mean()
-                # print(f"past_avg: {past_avg}")
-                if pd.notna(past_avg) and last_vol > past_avg * slice_factor:
-                    signals.iloc[-1] = True
-
-            return signals
+            # тот же расчёт, что и в панели (одна строка панели)
+            result = self.volf_panel({"Volume": self.panel_row(df, 'Volume')}, ind_rules)
+            if result is None:
+                return signals
+            return pd.Series([result[0][0]], index=df.index[-1:], name="VOLF", dtype=bool)
 
         except Exception as ex:
             self.error_handler.debug_error_notes(f"volf_calc ошибка: {ex}")
             return signals 
 
+    # --- панельный расчёт (symbols x bars); per-symbol *_calc считают через них же одну строку ---
+    def trend_ema_panel(self, panel: dict, ind_rules: dict):
+        period1 = ind_rules['period1']
+        period2 = ind_rules['period2']
+        col_name = ind_rules['col_name']
+        is_trend: int = int(ind_rules.get("is_trend", 1))
+        values = panel.get(col_name)
+        # некорректные параметры и короткая история -- поштучный путь с его диагностикой
+        if values is None or period2 == 1 or period1 >= period2 or values.shape[1] < min(period1, period2):
+            return None
+
+        fast, slow = trend_ema_panel_kernel(values, period1, period2)
+        signals = np.select([fast > slow, fast < slow], [is_trend, -is_trend], default=0)
+        return signals, "TREND_EMA", int
+
+    def stochrsi_panel(self, panel: dict, ind_rules: dict):
+        period = ind_rules.get('period', 14)
+        k = ind_rules.get('k', 3)
+        d = ind_rules.get('d', 3)
+        over_buy = ind_rules.get('over_buy', 70)
+        over_sell = ind_rules.get('over_sell', 30)
+        close = panel["Close"]
+        if close.shape[1] < period + k + d:
+            return None
+
+        k_last, d_last = stochrsi_panel_kernel(close, period, k, d, 14)
+        signals = np.select(
+            condlist=[
+                (k_last <= over_sell) & (d_last <= over_sell),
+                (k_last >= over_buy) & (d_last >= over_buy)
+            ],
+            choicelist=[1, -1],
+            default=0
+        )
+        return signals, "STOCHRSI", int
+
+    def volf_panel(self, panel: dict, ind_rules: dict):
+        period = ind_rules.get('period')
+        mode = ind_rules.get('mode', 'a')
+        volume = np.abs(panel["Volume"])
+        if not isinstance(period, int) or period <= 0 or mode not in ('r', 'a') or volume.shape[1] < period + 2:
+            return None
+
+        slice_factor = ind_rules.get(mode, {}).get('slice_factor', 1.0)
+        # последний закрытый бар (предпоследняя строка) против period баров перед ним:
+        # объём формирующейся свечи на WS-пути ещё не накоплен, на REST -- неполный
+        ref_values = volume[:, -(period + 2):-2]
+        reference = ref_values.max(axis=1) if mode == 'a' else ref_values.mean(axis=1)
+        signals = volume[:, -2] > reference * slice_factor
+        return signals, "VOLF", bool
+
     # def ema_cross_calc(self, df, params):
     #     """
     #     Боевой EMA-кроссовер с фильтром ускорения и импульса.
@@ -322,7 +390,7 @@ class INDICATORS:
     # 
     # 
 
-    def cron_ind_calc(self, df, ind_rules):
+    def cron_ind_calc(self, df, ind_rules, stream_key=None):
         return pd.Series([True] * len(df), index=df.index, name="CRON_IND", dtype=bool)
 
 class SIGNALS(INDICATORS):
@@ -336,10 +404,103 @@ class SIGNALS(INDICATORS):
         error_handler.wrap_foreign_methods(self)   
         self.tfr_valid = tfr_valid    
         self.default_columns = ['Time', 'Open', 'High', 'Low', 'Close', 'Volume']
+        # symbol_tfr -> (версия последнего бара, {(индикатор, параметры): результат})
+        self.ind_memo: Dict[str, Tuple[tuple, dict]] = {}
 
     def signals_debug(self, msg, symbol=None):
         self.error_handler.debug_info_notes(f"{msg} (Symbol: {symbol})" if symbol else msg, True)
 
+    def memo_indicator(self, calc_ind_func, ind_name, df, ind_rules, stream_key):
+        """
+        Результат индикатора один на свечу для всех пользователей, стратегий и сторон.
+        Версия -- время открытия и значения последнего бара: обновление незакрытой свечи
+        или новый бар сбрасывают все результаты по symbol_tfr.
+        """
+        if df.empty:
+            return calc_ind_func(df, ind_rules, stream_key=stream_key)
+
+        memo = self.memo_bucket(stream_key, df)
+        memo_key = (ind_name, freeze_params(ind_rules))
+        result = memo.get(memo_key)
+        if result is None:
+            result = calc_ind_func(df, ind_rules, stream_key=stream_key)
+            if result is not None:
+                memo[memo_key] = result
+        return result
+
+    def memo_bucket(self, stream_key: str, df: pd.DataFrame) -> dict:
+        """Результаты по symbol_tfr для текущей версии последнего бара (старые сбрасываются)."""
+        version = (df.index[-1], *(df[column].iat[-1] for column in self.default_columns[1:]))
+        memo = self.ind_memo.get(stream_key)
+        if memo is None or memo[0] != version:
+            memo = self.ind_memo[stream_key] = (version, {})
+        return memo[1]
+
+    # --- панельный расчёт: все символы ТФ одним проходом ---
+    def panel_specs(self) -> Dict[str, dict]:
+        """Уникальные включённые индикаторы из правил входа всех стратегий: tfr -> {memo_key: (ind_name, ind_rules)}."""
+        specs = {}
+        for sides in self.context.strategy_notes.values():
+            for side_settings in sides.values():
+                if not isinstance(side_settings, dict):
+                    continue
+                rules = side_settings.get("entry_conditions", {}).get("rules", {})
+                for ind_rules in rules.values():
+                    ind_name = (ind_rules.get("ind_name") or "").strip().lower()
+                    if not ind_rules.get("enable") or not hasattr(self, f"{ind_name}_panel"):
+                        continue
+                    if self.streaming and ind_name in ("trend_ema", "stochrsi"):
+                        continue    # в режиме INDICATORS_STREAMING источник -- инкрементальные состояния
+                    memo_key = (ind_name, freeze_params(ind_rules))
+                    specs.setdefault(ind_rules.get("tfr"), {})[memo_key] = (ind_name, ind_rules)
+        return specs
+
+    def evaluate_panel(self, symbols) -> None:
+        """
+        На новой свече считает индикаторы сразу по всем символам: свечи ТФ складываются
+        в матрицы symbols x bars (символы с одинаковой сеткой времени), результат
+        кладётся в ind_memo, и get_signal только читает готовые значения.
+        Символы вне панели (короткая или сдвинутая история) считаются поштучно, как раньше.
+        """
+        for tfr, specs in self.panel_specs().items():
+            groups: Dict[tuple, list] = {}
+            for symbol in symbols:
+                df = self.extract_df(symbol, tfr)
+                if not df.empty:
+                    groups.setdefault((len(df), df.index[0], df.index[-1]), []).append((symbol, df))
+
+            for group in groups.values():
+                if len(group) < 2:
+                    continue
+                panel = {
+                    column: np.vstack([df[column].to_numpy(dtype=np.float64) for _, df in group])
+                    for column in ("Close", "Volume")
+                }
+                buckets = [self.memo_bucket(f"{symbol}_{tfr}", df) for symbol, df in group]
+                last_index = group[0][1].index[-1:]     # у всей группы одна сетка времени
+                for memo_key, (ind_name, ind_rules) in specs.items():
+                    panel_func = getattr(self, f"{ind_name}_panel")
+                    result = panel_func(panel, ind_rules)
+                    if result is None:
+                        continue
+                    values, name, dtype = result
+                    for bucket, value in zip(buckets, values):
+                        bucket[memo_key] = pd.Series([value], index=last_index, name=name, dtype=dtype)
+
+    @staticmethod
+    def value_at(series: pd.Series, at_time):
+        """Значение series на момент at_time (последнее с индексом <= at_time), без reindex всей серии."""
+        if at_time is None or series.empty:
+            return np.nan
+        pos = series.index.searchsorted(at_time, side="right")
+        return series.iloc[pos - 1] if pos else np.nan
+
+    def signal_row(self, origin_df: pd.DataFrame) -> Tuple[dict, Any]:
+        """Значения последнего бара минимального ТФ -- основа для колонок индикаторов."""
+        if origin_df.empty:
+            return {}, None
+        return origin_df.iloc[-1].to_dict(), origin_df.index[-1]
+
     def extract_df(self, symbol, time_frame):
         default_df = pd.DataFrame(columns=self.default_columns)
         try:
@@ -369,10 +530,10 @@ class SIGNALS(INDICATORS):
         }
 
     def volf_stoch_colab(self, data, symbol, is_close_bar, ind_suffics, entry_rules):
-        """Генерация сигналов Trend + Volume Filter с учетом закрытия бара."""
+        """Генерация сигналов Trend + Volume Filter с учетом закрытия бара (data -- значения последнего бара)."""
 
         def is_valid_volf_data(data, required_cols):
-            return all(col in data.columns and pd.notna(data[col].iloc[-1]) for col in required_cols)
+            return all(pd.notna(data.get(col)) for col in required_cols)
 
         # Проверка закрытия свечи
         if is_close_bar:
@@ -405,15 +566,14 @@ class SIGNALS(INDICATORS):
 
         # Проверка наличия данных и ненулевых значений последних баров
         if not is_valid_volf_data(data, required_cols):
-            missing_cols = [col for col in required_cols
-                            if col not in data.columns or pd.isna(data[col].iloc[-1])]
+            missing_cols = [col for col in required_cols if pd.isna(data.get(col))]
             self.error_handler.debug_error_notes(f"[volf][{symbol}]: недостаточно данных. NaN в: {missing_cols}")
             return 0, 0
 
         # Получаем последние значения индикаторов (только включенные)
-        trend_ema_val = data[trend_ema_column].iloc[-1] if trend_enabled else None
-        volf_val = data[volf_column].iloc[-1] if volf_enabled else None
-        stoch_rsi_val = data[stoch_rsi_column].iloc[-1] if stoch_rsi_enabled else None
+        trend_ema_val = data[trend_ema_column] if trend_enabled else None
+        volf_val = data[volf_column] if volf_enabled else None
+        stoch_rsi_val = data[stoch_rsi_column] if stoch_rsi_enabled else None
 
         # Логика тренда
         if trend_enabled:
@@ -698,7 +858,8 @@ class SIGNALS(INDICATORS):
 
             # --- Данные по минимальному ТФ ---
             min_tfr = self.context.ukik_suffics_data["min_tfr"]
-            origin_df = self.extract_df(symbol, min_tfr)
+            # Кэшированный DataFrame не изменяем: индикаторы пишутся в отдельную строку сигнала
+            signal_data, last_time = self.signal_row(self.extract_df(symbol, min_tfr))
 
             if not signal_on:
                 open_signal = True
@@ -721,10 +882,10 @@ class SIGNALS(INDICATORS):
                     tfr_cache[tfr] = self.extract_df(symbol, tfr)
                 process_df = tfr_cache[tfr]
 
-                new_ind_column = calc_ind_func(process_df, ind_rules)
+                new_ind_column = self.memo_indicator(calc_ind_func, ind_name, process_df, ind_rules, f"{symbol}_{tfr}")
                 if isinstance(new_ind_column, pd.Series):
                     unik_column_name = f"{ind_marker.strip()}_{ind_suffics}"
-                    origin_df[unik_column_name] = new_ind_column.reindex(origin_df.index).ffill()
+                    signal_data[unik_column_name] = self.value_at(new_ind_column, last_time)
                 else:
                     self.signals_debug(
                         f"❌ Invalid indicator output (not Series). Symbol: {symbol}",
@@ -737,7 +898,7 @@ class SIGNALS(INDICATORS):
             signal_func = getattr(self, gen_signal_func_name + "_colab", None)
             # if callable(signal_func) and validate_dataframe(origin_df):
             if callable(signal_func):
-                result = signal_func(origin_df, symbol, is_close_bar, ind_suffics, entry_rules)
+                result = signal_func(signal_data, symbol, is_close_bar, ind_suffics, entry_rules)
                 if isinstance(result, (tuple, list)) and len(result) == 2:
                     long_signal, short_signal = result
                     open_signal, avg_signal, close_signal = self.signal_interpreter(
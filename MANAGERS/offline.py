@@ -1,14 +1,18 @@
 import asyncio
 import aiofiles
+import time
+import numpy as np
 import pandas as pd
 from random import choice
 from pathlib import Path
 from collections import OrderedDict
 import pickle
+import json
 from typing import *
 from b_context import BotContext
 from c_log import ErrorHandler
-from c_validators import validate_dataframe
+from c_utils import TimingUtils, SymbolSpec, build_symbol_index
+from d_bapi import KlinesArrays
 # import traceback
 import os
 
@@ -23,15 +27,167 @@ TRADES_INFO_FILE = TRADES_DIR / "info_.txt"
 TRADES_SECONDARY_FILE = TRADES_DIR / "secondary_.txt"
 TRADES_FAILED_FILE = TRADES_DIR / "failed_.txt"
 TRADES_SUCC_FILE = TRADES_DIR / "success_.txt"
+KLINES_DIR = BASE_DIR / "INFO" / "KLINES"
+EXCHANGE_INFO_FILE = BASE_DIR / "INFO" / "exchange_info.json"
+
+
+
+class KlinesRing:
+    """
+    Кольцевой буфер свечей фиксированной ёмкости для одной пары (symbol, tfr).
+    Память выделяется один раз; новая свеча перезаписывает самую старую,
+    свеча с тем же временем открытия обновляет последнюю (незакрытую).
+    """
+    value_columns = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+    def __init__(self, capacity: int):
+        self.capacity = max(int(capacity), 1)
+        self.times = np.zeros(self.capacity, dtype=np.int64)                        # open time, ms
+        self.values = np.zeros((self.capacity, len(self.value_columns)), dtype=np.float64)
+        self.head = 0   # индекс следующей записи
+        self.size = 0
+        self._df: Optional[pd.DataFrame] = None
+
+    @property
+    def last_open_time(self) -> Optional[int]:
+        if not self.size:
+            return None
+        return int(self.times[(self.head - 1) % self.capacity])
+
+    def push(self, open_time: int, row) -> None:
+        last_time = self.last_open_time
+        if last_time is not None and open_time < last_time:
+            return  # устаревшая свеча
+        if last_time is not None and open_time == last_time:
+            idx = (self.head - 1) % self.capacity
+        else:
+            idx = self.head
+            self.head = (self.head + 1) % self.capacity
+            self.size = min(self.size + 1, self.capacity)
+        self.times[idx] = open_time
+        self.values[idx] = row
+        self._df = None
+
+    def extend(self, times: np.ndarray, values: np.ndarray) -> None:
+        """Пачка свечей по возрастанию времени (векторная запись, без построчного push)."""
+        if not len(times):
+            return
+        last_time = self.last_open_time
+        if last_time is not None:
+            same = times == last_time
+            if same.any():
+                self.values[(self.head - 1) % self.capacity] = values[same][-1]
+                self._df = None
+            newer = times > last_time
+            times, values = times[newer], values[newer]
+
+        count = len(times)
+        if not count:
+            return
+        if count > self.capacity:
+            times, values = times[-self.capacity:], values[-self.capacity:]
+            count = self.capacity
+
+        idx = (self.head + np.arange(count)) % self.capacity
+        self.times[idx] = times
+        self.values[idx] = values
+        self.head = (self.head + count) % self.capacity
+        self.size = min(self.size + count, self.capacity)
+        self._df = None
+
+    def extend_from_klines(self, klines: KlinesArrays) -> None:
+        if klines.columns[:len(self.value_columns)] == self.value_columns:
+            values = klines.values[:, :len(self.value_columns)]
+        else:
+            values = np.column_stack([klines.column(name) for name in self.value_columns])
+        self.extend(klines.times, values)
+
+    def snapshot(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Копия (times, values) в хронологическом порядке."""
+        order = (np.arange(self.size) + self.head - self.size) % self.capacity
+        return self.times[order], self.values[order]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Свечи в хронологическом порядке (DataFrame кэшируется до следующего изменения)."""
+        if self._df is None:
+            times, values = self.snapshot()
+            df = pd.DataFrame(values, columns=self.value_columns)
+            df.index = pd.to_datetime(times, unit='ms')
+            df.index.name = 'Time'
+            self._df = df
+        return self._df
+
+
+class KlinesDiskStore:
+    """
+    Кеш истории свечей на диске: один .npy на (symbol, limit, tfr), колонки time + OHLCV
+    в структурированном массиве. Читается через mmap, пишется атомарно (tmp + replace).
+    """
+
+    def __init__(self, error_handler: ErrorHandler, directory: Optional[Path] = None):
+        error_handler.wrap_foreign_methods(self)
+        self.error_handler = error_handler
+        self.directory = Path(directory) if directory else KLINES_DIR
+        self.dtype = np.dtype([("time", np.int64)] + [(name, np.float64) for name in KlinesRing.value_columns])
+
+    def path(self, full_symbol: str) -> Path:
+        return self.directory / f"{full_symbol}.npy"
+
+    def load(self, full_symbol: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        path = self.path(full_symbol)
+        if not path.is_file():
+            return None
+        try:
+            data = np.load(path, mmap_mode="r")
+            if data.dtype != self.dtype:
+                return None
+            values = np.column_stack([data[name] for name in KlinesRing.value_columns])
+            return np.array(data["time"]), values
+        except Exception as e:
+            self.error_handler.debug_error_notes(f"[KlinesDiskStore] не удалось прочитать {path.name}: {e}")
+            return None
+
+    def _write(self, full_symbol: str, times: np.ndarray, values: np.ndarray) -> None:
+        data = np.empty(len(times), dtype=self.dtype)
+        data["time"] = times
+        for idx, name in enumerate(KlinesRing.value_columns):
+            data[name] = values[:, idx]
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path(full_symbol)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as file:
+            np.save(file, data)
+        os.replace(tmp_path, path)
+
+    async def save(self, rings: Dict[str, "KlinesRing"]) -> None:
+        """Пишет переданные буферы в фоне (в отдельном потоке)."""
+        snapshots = [(full_symbol, *ring.snapshot()) for full_symbol, ring in rings.items() if ring.size]
+        if not snapshots:
+            return
 
+        def _save_all():
+            for full_symbol, times, values in snapshots:
+                self._write(full_symbol, times, values)
+        try:
+            await asyncio.to_thread(_save_all)
+        except Exception as e:
+            self.error_handler.debug_error_notes(f"[KlinesDiskStore] ошибка записи кеша свечей: {e}")
 
 
 class KlinesCacheManager:
-    def __init__(self, context: BotContext, error_handler: ErrorHandler, get_klines: Callable):    
+    def __init__(
+            self,
+            context: BotContext,
+            error_handler: ErrorHandler,
+            get_klines: Callable,
+            disk_store: Optional[KlinesDiskStore] = None
+        ):    
         error_handler.wrap_foreign_methods(self)
         self.error_handler = error_handler
         self.context = context
         self.get_klines = get_klines
+        self.disk_store = disk_store
         self.klines_lim = self.context.ukik_suffics_data.get("klines_lim")
         # print(self.klines_lim)
         self.avi_tfr = self.context.ukik_suffics_data.get("avi_tfr")
@@ -39,6 +195,10 @@ class KlinesCacheManager:
         self.api_key_list = [x.get("proxy_url", None) for _, x in self.context.total_settings.items()]
         # print(f"api_key_list: {self.api_key_list}")
         self.default_columns = ['Time', 'Open', 'High', 'Low', 'Close', 'Volume']
+        self.klines_store: Dict[str, KlinesRing] = {}   # full_symbol -> KlinesRing
+        self.ws_aggregates: Dict[str, dict] = {}        # full_symbol -> свеча старшего ТФ, собранная из WS 1m
+        self.disk_checked: Set[str] = set()              # full_symbol, для которых уже смотрели кеш на диске
+        self.dirty: Set[str] = set()                     # изменённые с последней записи на диск
 
     def get_klines_scheduler(self, active_symbols, interval_completed):
         return (
@@ -46,16 +206,151 @@ class KlinesCacheManager:
             (self.context.first_iter and active_symbols)
         )
 
+    def get_ring(self, full_symbol: str) -> Optional[KlinesRing]:
+        """Буфер свечей; при первом обращении лениво поднимается из кеша на диске."""
+        ring = self.klines_store.get(full_symbol)
+        if ring is not None or self.disk_store is None or full_symbol in self.disk_checked:
+            return ring
+
+        self.disk_checked.add(full_symbol)
+        loaded = self.disk_store.load(full_symbol)
+        if not loaded:
+            return None
+        ring = self.klines_store[full_symbol] = KlinesRing(self.klines_lim)
+        ring.extend(*loaded)
+        self.context.klines_data_cache[full_symbol] = ring.to_dataframe()
+        return ring
+
     async def update_klines(self, new_klines, symbol: str, suffics: str):
         full_symbol = f"{symbol}{suffics}"
         if full_symbol not in self.context.klines_data_cache:
             self.context.klines_data_cache[full_symbol] = pd.DataFrame(columns=self.default_columns)
 
-        if validate_dataframe(new_klines):
-            self.context.klines_data_cache[full_symbol] = new_klines
+        if isinstance(new_klines, KlinesArrays) and not new_klines.empty:
+            ring = self.get_ring(full_symbol)
+            if ring is None:
+                ring = self.klines_store[full_symbol] = KlinesRing(self.klines_lim)
+            ring.extend_from_klines(new_klines)
+            self.dirty.add(full_symbol)
+            self.context.klines_data_cache[full_symbol] = ring.to_dataframe()
         else:
             self.error_handler.debug_error_notes(f"[update_klines] Невалидные данные для {full_symbol}.")
 
+    def push_closed_bar(self, symbol: str, open_time: int, row: tuple) -> None:
+        """
+        Закрытая минутная свеча из WS. Агрегирует её во все используемые ТФ и пишет в кольцевые буферы.
+        Старшая свеча пишется, только если собрана из WS с самого начала своего интервала
+        (иначе остаётся версия из REST до следующего интервала).
+        Когда минута закрывает интервал ТФ, следом пишется открывшаяся свеча (O=H=L=C = close, V=0),
+        чтобы последней строкой, как и после REST, была формирующаяся свеча.
+        """
+        if not self.klines_store:
+            return
+
+        minute_ms = 60_000
+        is_updated = False
+        for time_frame in self.avi_tfr:
+            full_symbol = f"{symbol}_{self.klines_lim}_{time_frame}"
+            ring = self.klines_store.get(full_symbol)
+            if ring is None or not ring.size:
+                continue  # сначала нужна первичная загрузка через REST
+
+            tfr_ms = TimingUtils.interval_to_seconds(time_frame) * 1000
+            bucket = open_time - open_time % tfr_ms
+            agg = self.ws_aggregates.get(full_symbol)
+
+            if open_time == bucket:
+                agg = {"bucket": bucket, "row": np.array(row, dtype=np.float64), "last_minute": open_time}
+            elif agg and agg["bucket"] == bucket and agg["last_minute"] == open_time - minute_ms:
+                agg_row = agg["row"]
+                agg_row[1] = max(agg_row[1], row[1])
+                agg_row[2] = min(agg_row[2], row[2])
+                agg_row[3] = row[3]
+                agg_row[4] += row[4]
+                agg["last_minute"] = open_time
+            else:
+                # пропущена минута или старт с середины интервала
+                self.ws_aggregates.pop(full_symbol, None)
+                continue
+
+            self.ws_aggregates[full_symbol] = agg
+            last_open_time = ring.last_open_time
+            if last_open_time < bucket - tfr_ms:
+                continue  # дыра в истории — закроется REST-догрузкой
+
+            ring.push(bucket, agg["row"])
+            if open_time + minute_ms == bucket + tfr_ms:
+                close = agg["row"][3]
+                ring.push(bucket + tfr_ms, (close, close, close, close, 0.0))
+            self.dirty.add(full_symbol)
+            self.context.klines_data_cache[full_symbol] = ring.to_dataframe()
+            is_updated = True
+
+        if is_updated:
+            self.context.publish_event("candle", symbol=symbol)
+
+    def ws_frames_state(self) -> Tuple[Dict[str, Set[str]], Dict[str, Set[str]]]:
+        """
+        Состояние (ТФ -> символы) относительно последней закрытой минуты:
+        pending -- WS ведёт агрегат и минута ещё может прийти; missing -- из WS её не собрать
+        (агрегат старшего ТФ начинается только с границы интервала), нужен REST.
+        """
+        minute_ms = 60_000
+        last_minute = (int(time.time() * 1000) // minute_ms - 1) * minute_ms
+        pending: Dict[str, Set[str]] = {}
+        missing: Dict[str, Set[str]] = {}
+        for time_frame in self.avi_tfr:
+            tfr_ms = TimingUtils.interval_to_seconds(time_frame) * 1000
+            for symbol in self.fetch_symbols:
+                full_symbol = f"{symbol}_{self.klines_lim}_{time_frame}"
+                agg = self.ws_aggregates.get(full_symbol)
+                if agg and agg["last_minute"] == last_minute:
+                    continue
+                ring = self.klines_store.get(full_symbol)
+                tracking = agg and agg["last_minute"] == last_minute - minute_ms
+                if ring is not None and ring.size and (tracking or last_minute % tfr_ms == 0):
+                    pending.setdefault(time_frame, set()).add(symbol)
+                else:
+                    missing.setdefault(time_frame, set()).add(symbol)
+        return pending, missing
+
+    async def wait_ws_bars(self, timeout: float) -> Dict[str, Set[str]]:
+        """
+        Ждёт (не дольше timeout) закрытые свечи из WS только для тех ТФ и символов, где они могут прийти.
+        Возвращает ТФ -> символы, которые нужно догрузить через REST (пусто -- всё собрано из WS).
+        """
+        if not self.klines_store:
+            return {time_frame: set(self.fetch_symbols) for time_frame in self.avi_tfr}
+        deadline = time.monotonic() + timeout
+        pending, missing = self.ws_frames_state()
+        while pending and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            pending, missing = self.ws_frames_state()
+        for time_frame, symbols in pending.items():
+            missing.setdefault(time_frame, set()).update(symbols)
+        return missing
+
+    def missing_klines_plan(self, full_symbol: str, interval: str, fetch_limit: int) -> Tuple[int, Optional[int]]:
+        """
+        Сколько свечей догрузить и с какого времени открытия.
+        После первичной загрузки запрашиваются только свечи начиная с последней сохранённой
+        (она могла быть незакрытой), иначе — полная история (start_time=None).
+        """
+        ring = self.get_ring(full_symbol)
+        last_open_time = ring.last_open_time if ring else None
+        if last_open_time is None:
+            return fetch_limit, None
+
+        interval_ms = TimingUtils.interval_to_seconds(interval) * 1000
+        now_ms = int(time.time() * 1000)
+        missing = (now_ms - last_open_time) // interval_ms + 1
+        if missing >= fetch_limit:
+            return fetch_limit, None
+        if missing > 1000:
+            # длинный простой: одна страница от start_time не дотянется до текущей свечи
+            return int(missing), None
+        return int(missing), last_open_time
+
     async def fetch_klines_for_symbols(
         self, session, symbols: set, interval: str, fetch_limit: int, api_key_list: list = None
     ):
@@ -63,18 +358,19 @@ class KlinesCacheManager:
         Асинхронно получает свечи для списка символов по заданному таймфрейму.
         """
         MAX_CONCURRENT_REQUESTS = 20
-        REQUEST_DELAY = 0.1
         semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
 
         async def fetch_kline(symbol):
             async with semaphore:
                 try:
-                    await asyncio.sleep(REQUEST_DELAY)
                     api_key = choice(api_key_list) if api_key_list else None
-                    return symbol, await self.get_klines(session, symbol, interval, fetch_limit, api_key)
+                    limit, start_time = self.missing_klines_plan(
+                        f"{symbol}_{fetch_limit}_{interval}", interval, fetch_limit
+                    )
+                    return symbol, await self.get_klines(session, symbol, interval, limit, api_key, start_time)
                 except Exception as e:
                     self.error_handler.debug_error_notes(f"Ошибка при получении свечей для {symbol} [{interval}]: {e}")
-                    return symbol, pd.DataFrame(columns=self.default_columns)
+                    return symbol, KlinesArrays.empty_like()
 
         tasks = [fetch_kline(symbol) for symbol in symbols]
         return await asyncio.gather(*tasks)
@@ -88,21 +384,122 @@ class KlinesCacheManager:
         for symbol, new_klines in klines_result:
             await self.update_klines(new_klines, symbol, suffics)
 
-    async def total_klines_handler(self, session):
+    async def total_klines_handler(self, session, frames: Optional[Dict[str, Set[str]]] = None):
         """
-        Получение и обновление свечей для всех символов и всех доступных таймфреймов.
+        Получение и обновление свечей: по умолчанию для всех символов и всех доступных таймфреймов,
+        либо только для frames (ТФ -> символы).
         """
+        if frames is None:
+            frames = {time_frame: self.fetch_symbols for time_frame in self.avi_tfr}
         try:
             tasks = [
-                self.process_timeframe(session, time_frame, self.fetch_symbols, self.klines_lim, self.api_key_list)
-                for time_frame in self.avi_tfr
+                self.process_timeframe(session, time_frame, symbols, self.klines_lim, self.api_key_list)
+                for time_frame, symbols in frames.items() if symbols
             ]
             await asyncio.gather(*tasks)
 
         except Exception as e:
             self.error_handler.debug_error_notes(f"[ERROR] in total_klines_handler: {e}")
             return
+
+        await self.save_to_disk()
+
+    async def save_to_disk(self):
+        """Сбрасывает изменённые буферы в кеш на диске."""
+        if self.disk_store is None or not self.dirty:
+            return
+        rings = {full_symbol: self.klines_store[full_symbol] for full_symbol in self.dirty if full_symbol in self.klines_store}
+        self.dirty.clear()
+        await self.disk_store.save(rings)
         
+class ExchangeInfoManager:
+    """
+    Индекс exchangeInfo (symbol -> SymbolSpec) в context.symbol_specs.
+    Хранится на диске с TTL, обновляется в фоне.
+    """
+
+    def __init__(
+            self,
+            context: BotContext,
+            error_handler: ErrorHandler,
+            get_exchange_info: Callable,
+            ttl: float,
+            file_path: Path = EXCHANGE_INFO_FILE
+        ):
+        error_handler.wrap_foreign_methods(self)
+        self.error_handler = error_handler
+        self.context = context
+        self.get_exchange_info = get_exchange_info
+        self.ttl = ttl
+        self.file_path = Path(file_path)
+        self.updated_at: float = 0.0   # time.time() последнего обновления индекса
+
+    def _read_file(self) -> Optional[dict]:
+        if not self.file_path.is_file():
+            return None
+        with open(self.file_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def _write_file(self, payload: dict) -> None:
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.file_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(payload, file)
+        os.replace(tmp_path, self.file_path)
+
+    def _apply(self, specs: Dict[str, SymbolSpec], updated_at: float) -> None:
+        self.context.symbol_specs = specs
+        self.updated_at = updated_at
+
+    async def load_from_disk(self) -> bool:
+        """Поднимает индекс с диска (даже просроченный). True -- если он ещё в пределах TTL."""
+        try:
+            payload = await asyncio.to_thread(self._read_file)
+        except Exception as e:
+            self.error_handler.debug_error_notes(f"[ExchangeInfoManager] не удалось прочитать кеш: {e}")
+            return False
+        if not payload or not payload.get("symbols"):
+            return False
+        self._apply(
+            {symbol: SymbolSpec(*row) for symbol, row in payload["symbols"].items()},
+            float(payload.get("updated_at", 0.0))
+        )
+        return time.time() - self.updated_at < self.ttl
+
+    async def refresh(self, session) -> bool:
+        """Запрашивает exchangeInfo, перестраивает индекс и сохраняет его на диск."""
+        exchange_info = await self.get_exchange_info(session)
+        specs = build_symbol_index(exchange_info)
+        if not specs:
+            self.error_handler.debug_error_notes("[ExchangeInfoManager] пустой exchangeInfo, оставляем прежний индекс")
+            return False
+
+        self.context.symbol_info = exchange_info
+        self._apply(specs, time.time())
+        try:
+            payload = {"updated_at": self.updated_at, "symbols": {symbol: list(spec) for symbol, spec in specs.items()}}
+            await asyncio.to_thread(self._write_file, payload)
+        except Exception as e:
+            self.error_handler.debug_error_notes(f"[ExchangeInfoManager] ошибка записи кеша: {e}")
+        return True
+
+    async def initialize(self, session) -> bool:
+        """Старт: свежий кеш с диска, иначе запрос (при неудаче -- просроченный кеш лучше, чем ничего)."""
+        if await self.load_from_disk():
+            return True
+        return await self.refresh(session) or bool(self.context.symbol_specs)
+
+    async def refresh_loop(self, session) -> None:
+        """Фоновое обновление раз в TTL."""
+        while not self.context.stop_bot:
+            delay = max(1.0, self.updated_at + self.ttl - time.time())
+            await asyncio.sleep(delay)
+            if self.context.stop_bot:
+                break
+            if not await self.refresh(session):
+                self.updated_at = time.time() - self.ttl + 60.0   # повтор через минуту
+
+
 # ///        
 class FileManager:
     def __init__(self, error_handler: ErrorHandler):   
@@ -3,27 +3,199 @@ import aiohttp
 import json
 import websockets
 from websockets.exceptions import ConnectionClosedError, ConnectionClosedOK
-from typing import List, Optional, Iterable
+from typing import Callable, Dict, List, Optional, Iterable, Set
+from a_settings import (
+    WS_STREAMS_PER_CONNECTION, HTTP_LIMIT_PER_HOST, HTTP_DNS_TTL,
+    HTTP_KEEPALIVE_TIMEOUT, HTTP_CONNECT_TIMEOUT, HTTP_TOTAL_TIMEOUT,
+    HTTP_MAX_FAILURES, HTTP_REBUILD_COOLDOWN
+)
 from b_context import BotContext
 from c_log import ErrorHandler
 import contextlib
+import time
 import traceback
 
+# быстрый JSON-декодер, если установлен (orjson -> msgspec -> stdlib json)
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    try:
+        from msgspec.json import decode as json_loads
+    except ImportError:
+        json_loads = json.loads
+
 
 MAX_RECONNECT = 3
 
+# Полосы запросов: у каждой свой пул соединений и семафор,
+# чтобы ордера не стояли в очереди за свечами и фильтром.
+LANE_CRITICAL = "critical"   # make_order, place_risk_order, cancel_order_by_id
+LANE_NORMAL = "normal"       # fetch_positions, баланс, listenKey
+LANE_BULK = "bulk"           # klines, exchangeInfo, userTrades
+LANE_LIMITS = {
+    LANE_CRITICAL: 10,
+    LANE_NORMAL: 10,
+    LANE_BULK: 30,
+}
+
+
+class PoolStats:
+    """
+    Счётчики пула одной полосы через aiohttp TraceConfig:
+    новые соединения (рукопожатия TCP+TLS / CONNECT прокси) против переиспользованных.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.handshakes = 0
+        self.reused = 0
+        self.dns_hits = 0
+        self.dns_misses = 0
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx, params):
+            self.requests += 1
+
+        async def on_connection_create_end(session, ctx, params):
+            self.handshakes += 1
+
+        async def on_connection_reuseconn(session, ctx, params):
+            self.reused += 1
+
+        async def on_dns_cache_hit(session, ctx, params):
+            self.dns_hits += 1
+
+        async def on_dns_cache_miss(session, ctx, params):
+            self.dns_misses += 1
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace.on_dns_cache_miss.append(on_dns_cache_miss)
+        return trace
+
+
+def create_pooled_session(limit: int, stats: Optional[PoolStats] = None) -> aiohttp.ClientSession:
+    """
+    Фабрика сессий с настроенным пулом (лимиты, кеш DNS, keep-alive, таймауты из a_settings).
+    aiohttp работает только по HTTP/1.1: для HTTP/2 подставьте в NetworkManager.session_factory
+    свою фабрику с тем же интерфейсом сессии.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=limit,
+        limit_per_host=HTTP_LIMIT_PER_HOST,
+        ttl_dns_cache=HTTP_DNS_TTL,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+    )
+    timeout = aiohttp.ClientTimeout(total=HTTP_TOTAL_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=timeout,
+        trace_configs=[stats.trace_config()] if stats else None,
+    )
+
+
 class NetworkManager:
     def __init__(self, error_handler: ErrorHandler, proxy_url: str=None, user_label: str=None):
         error_handler.wrap_foreign_methods(self)
         self.error_handler = error_handler
 
-        self.session: Optional[aiohttp.ClientSession] = None
+        self.session: Optional[aiohttp.ClientSession] = None   # = полоса normal
+        self.lanes: Dict[str, aiohttp.ClientSession] = {}
+        self.lane_semaphores: Dict[str, asyncio.Semaphore] = {
+            lane: asyncio.Semaphore(limit) for lane, limit in LANE_LIMITS.items()
+        }
+        self.lane_stats: Dict[str, PoolStats] = {lane: PoolStats() for lane in LANE_LIMITS}
+        self.session_factory: Callable[[int, Optional[PoolStats]], aiohttp.ClientSession] = create_pooled_session
         self.proxy_url = proxy_url
         self.user_label = user_label
 
+        # пассивное здоровье по реальным запросам
+        self.healthy: bool = True
+        self.consecutive_failures: int = 0
+        self.latency: Optional[float] = None   # сглаженная задержка, сек
+        self.last_rebuild: float = 0.0
+        self.rebuild_task: Optional[asyncio.Task] = None
+        self.closing: bool = False
+
     async def initialize_session(self):
-        if not self.session or self.session.closed:
-            self.session = aiohttp.ClientSession()
+        for lane, limit in LANE_LIMITS.items():
+            session = self.lanes.get(lane)
+            if not session or session.closed:
+                self.lanes[lane] = self.session_factory(limit, self.lane_stats[lane])
+        self.session = self.lanes[LANE_NORMAL]
+
+    def lane_session(self, lane: str) -> aiohttp.ClientSession:
+        session = self.lanes.get(lane)
+        return session if session and not session.closed else self.session
+
+    @contextlib.asynccontextmanager
+    async def lane(self, lane: str):
+        """Слот в полосе lane: ждём только запросы своей полосы. Исход запроса идёт в учёт здоровья."""
+        async with self.lane_semaphores[lane]:
+            start = time.monotonic()
+            try:
+                yield self.lane_session(lane)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                self.record_failure()
+                raise
+            else:
+                self.record_success(time.monotonic() - start)
+
+    def record_success(self, latency: float) -> None:
+        self.consecutive_failures = 0
+        self.healthy = True
+        self.latency = latency if self.latency is None else self.latency * 0.8 + latency * 0.2
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.consecutive_failures < HTTP_MAX_FAILURES or self.closing:
+            return
+        if self.healthy:
+            self.healthy = False
+            self.error_handler.debug_error_notes(
+                f"{self.user_label}: {self.consecutive_failures} неудачных запросов подряд, пересоздаём сессии в фоне"
+            )
+        if (self.rebuild_task is None or self.rebuild_task.done()) \
+                and time.monotonic() - self.last_rebuild >= HTTP_REBUILD_COOLDOWN:
+            self.rebuild_task = asyncio.create_task(self.rebuild_sessions())
+
+    async def rebuild_sessions(self) -> None:
+        """Пересоздаёт пулы всех полос. Объект тот же -- ссылки клиентов остаются валидными."""
+        self.last_rebuild = time.monotonic()
+        await self._close_lanes()
+        if self.closing:
+            return
+        await self.initialize_session()
+        self.consecutive_failures = 0
+
+    def pool_report(self) -> Dict[str, dict]:
+        """Загрузка пулов по полосам и сколько рукопожатий сэкономил keep-alive."""
+        report = {}
+        for lane, stats in self.lane_stats.items():
+            session = self.lanes.get(lane)
+            connector = session.connector if session and not session.closed else None
+            report[lane] = {
+                "limit": LANE_LIMITS[lane],
+                "in_use": len(getattr(connector, "_acquired", ())) if connector else 0,
+                "requests": stats.requests,
+                "handshakes": stats.handshakes,
+                "reused": stats.reused,
+                "dns_hits": stats.dns_hits,
+                "dns_misses": stats.dns_misses,
+            }
+        return report
+
+    async def _close_lanes(self):
+        for session in self.lanes.values():
+            if session and not session.closed:
+                try:
+                    await session.close()
+                except Exception as e:
+                    self.error_handler.debug_error_notes(f"{self.user_label}: Ошибка при закрытии сессии: {e}. ")
 
     async def _check_session_connection(self, session):
         try:
@@ -45,10 +217,7 @@ class NetworkManager:
                 if await self._check_session_connection(self.session):
                     return True, was_reconnected  # Успешно, даже если reconnected = False
 
-                try:
-                    await self.session.close()
-                except Exception as e:
-                    self.error_handler.debug_error_notes(f"{self.user_label}: Ошибка при закрытии сессии: {e}. ")
+                await self._close_lanes()
 
             await asyncio.sleep((attempt * 1.6) + 1)
             self.error_handler.debug_error_notes(f"🔁 {self.user_label}: Попытка восстановить сессию ({attempt}/{MAX_RECONNECT})...")
@@ -59,166 +228,442 @@ class NetworkManager:
         return False, was_reconnected
     
     async def shutdown_session(self):
-        """Закрытие aiohttp-сессии при остановке."""
-        if self.session and not self.session.closed:
-            try:
-                await self.session.close()
-            except Exception as e:
-                self.error_handler.debug_error_notes(f"{self.user_label}: ошибка при закрытии сессии в shutdown_session(): {e}. ")
+        """Закрытие aiohttp-сессий всех полос при остановке."""
+        self.closing = True
+        self.error_handler.debug_info_notes(f"{self.user_label}: пулы соединений: {self.pool_report()}")
+        await self._close_lanes()
 # # python -m MANAGERS.networks
 
 
-class WebSocketManager:
-    """Менеджер WebSocket-соединения для получения рыночных данных с Binance (aiohttp)."""
-
-    def __init__(self, context: BotContext,
-                 error_handler: ErrorHandler,
-                 proxy_url: Optional[str] = None,
-                 ws_url: str = "wss://fstream.binance.com/"):
-        error_handler.wrap_foreign_methods(self)
-        self.error_handler = error_handler
-        self.context = context
+class WsShard:
+    """
+    Одно WS-соединение со своим набором потоков.
+    Потоки добавляются и снимаются через SUBSCRIBE/UNSUBSCRIBE без переподключения,
+    после обрыва шард переподключается сам и переподписывается на свои потоки.
+    """
 
-        self.session: Optional[aiohttp.ClientSession] = None
-        self.ws: Optional[aiohttp.ClientWebSocketResponse] = None
+    def __init__(self, manager: "WebSocketManager", shard_id: int):
+        self.manager = manager
+        self.error_handler = manager.error_handler
+        self.shard_id = shard_id
 
-        self.ws_task: Optional[asyncio.Task] = None
+        self.streams: Set[str] = set()
+        self.websocket: Optional[aiohttp.ClientWebSocketResponse] = None
+        self.task: Optional[asyncio.Task] = None
         self.is_connected: bool = False
-        self.max_reconnect_attempts: int = 51
         self.reconnect_attempts: int = 0
-        self.ws_shutdown_event: asyncio.Event = asyncio.Event()
-        self.WEBSOCKET_URL: str = ws_url
-        self.last_symbol_progress = 0
+        self.request_id: int = 0
+        self.shutdown_event: asyncio.Event = asyncio.Event()
 
-        # можно указать прокси
-        self.proxy_url: Optional[str] = proxy_url
-        self.proxy_auth: Optional[aiohttp.BasicAuth] = None
+    async def send_method(self, method: str, streams: Iterable[str]) -> None:
+        """SUBSCRIBE/UNSUBSCRIBE. Без живого соединения ничего не шлём — подписка восстановится при подключении."""
+        streams = sorted(streams)
+        if not streams or not self.websocket or self.websocket.closed:
+            return
+        self.request_id += 1
+        await self.websocket.send_json({"method": method, "params": streams, "id": self.request_id})
 
-    async def handle_ws_message(self, message: str) -> None:
-        try:
-            msg = json.loads(message).get("data")
-            if not msg or msg.get("e") != "kline":
-                return
+    async def add_streams(self, streams: Set[str]) -> None:
+        new_streams = streams - self.streams
+        if not new_streams:
+            return
+        self.streams |= new_streams
+        if self.task is None or self.task.done():
+            # первый запуск или шард остановился после max_reconnect_attempts -- поднимаем заново,
+            # подписка на все потоки уйдёт при подключении
+            self.shutdown_event.clear()
+            self.reconnect_attempts = 0
+            self.task = asyncio.create_task(self.run())
+        else:
+            await self.send_method("SUBSCRIBE", new_streams)
 
-            symbol = msg["s"]
-            kline = msg["k"]
-            self.context.ws_price_data[symbol] = {
-                "close": float(kline["c"]),
-            }
-        except Exception as e:
-            self.error_handler.debug_error_notes(f"[WS Handle] Error: {e}, Traceback: {traceback.format_exc()}")
+    async def remove_streams(self, streams: Set[str]) -> None:
+        old_streams = streams & self.streams
+        if not old_streams:
+            return
+        self.streams -= old_streams
+        await self.send_method("UNSUBSCRIBE", old_streams)
 
     async def keepalive_ping(self) -> None:
-        """Отправляет ping каждые 15 секунд и ждёт pong."""
-        while not self.ws_shutdown_event.is_set() and self.ws:
+        """Отправляет ping каждые 15 секунд."""
+        while not self.shutdown_event.is_set() and self.websocket and not self.websocket.closed:
             try:
-                await self.ws.ping()
+                await self.websocket.ping()
                 await asyncio.sleep(15)
             except Exception as e:
-                self.error_handler.debug_error_notes(f"[Ping] Ошибка: {e}")
+                self.error_handler.debug_error_notes(f"[Ping][shard {self.shard_id}] Ошибка: {e}")
                 break
 
-    async def connect_and_handle(self, symbols: List[str]) -> None:
-        if not symbols:
-            self.error_handler.debug_error_notes("Empty symbols list provided")
-            return
-
-        streams = [f"{symbol.lower()}@kline_1m" for symbol in symbols]
-        self.ws_url = f"{self.WEBSOCKET_URL}stream?streams={'/'.join(streams)}"
-
-        if not self.session:
-            self.session = aiohttp.ClientSession()
-
-        while self.reconnect_attempts < self.max_reconnect_attempts:
-            if self.ws_shutdown_event.is_set():
+    async def run(self) -> None:
+        manager = self.manager
+        while self.reconnect_attempts < manager.max_reconnect_attempts:
+            if self.shutdown_event.is_set():
                 break
 
             try:
-                # --- Ключевой момент: подключение в стиле как ты показал ---
-                self.websocket = await self.session.ws_connect(
-                    self.ws_url,
-                    proxy=self.proxy_url,            # можно None
-                    proxy_auth=self.proxy_auth,  # можно None
-                    autoping=False               # сами управляем пингом
+                self.websocket = await manager.session.ws_connect(
+                    f"{manager.WEBSOCKET_URL}stream",
+                    proxy=manager.proxy_url,            # можно None
+                    proxy_auth=manager.proxy_auth,      # можно None
+                    autoping=False                      # сами управляем пингом
                 )
 
                 self.is_connected = True
                 self.reconnect_attempts = 0
+                await self.send_method("SUBSCRIBE", self.streams)
                 ping_task = asyncio.create_task(self.keepalive_ping())
 
                 try:
                     async for msg in self.websocket:
-                        if self.ws_shutdown_event.is_set():
+                        if self.shutdown_event.is_set():
                             await self.websocket.close(code=1000, message=b"Shutdown")
                             break
 
                         if msg.type == aiohttp.WSMsgType.TEXT:
-                            await self.handle_ws_message(msg.data)
+                            manager.feed_ws_message(msg.data)
+                        elif msg.type == aiohttp.WSMsgType.PING:
+                            await self.websocket.pong(msg.data)
                         elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
                             break
                 finally:
+                    self.is_connected = False
                     ping_task.cancel()
                     with contextlib.suppress(asyncio.CancelledError):
                         await ping_task
 
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 self.error_handler.debug_error_notes(
-                    f"[WS Error] {e}, Traceback: {traceback.format_exc()}, attempt {self.reconnect_attempts + 1}/{self.max_reconnect_attempts}"
+                    f"[WS Error][shard {self.shard_id}] {e}, Traceback: {traceback.format_exc()}, "
+                    f"attempt {self.reconnect_attempts + 1}/{manager.max_reconnect_attempts}"
                 )
 
+            if self.shutdown_event.is_set():
+                break
             self.reconnect_attempts += 1
             backoff = min(2 * self.reconnect_attempts, 10)
             await asyncio.sleep(backoff)
 
         self.is_connected = False
-        self.error_handler.debug_error_notes("Max reconnect attempts reached, WebSocket stopped")
+        if not self.shutdown_event.is_set():
+            self.error_handler.debug_error_notes(f"[shard {self.shard_id}] Max reconnect attempts reached, WebSocket stopped")
+
+    async def stop(self) -> None:
+        self.shutdown_event.set()
+        if self.task:
+            self.task.cancel()
+            try:
+                await asyncio.wait_for(self.task, timeout=5.0)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                pass
+            finally:
+                self.task = None
+                self.is_connected = False
+
+        if self.websocket and not self.websocket.closed:
+            await self.websocket.close()
+        self.websocket = None
+
+
+class WebSocketManager:
+    """
+    Менеджер WS-соединений для получения рыночных данных с Binance (aiohttp).
+    Потоки распределяются по нескольким соединениям (шардам) не более streams_per_connection на каждое.
+    """
+
+    def __init__(self, context: BotContext,
+                 error_handler: ErrorHandler,
+                 proxy_url: Optional[str] = None,
+                 ws_url: str = "wss://fstream.binance.com/",
+                 streams_per_connection: int = WS_STREAMS_PER_CONNECTION):
+        error_handler.wrap_foreign_methods(self)
+        self.error_handler = error_handler
+        self.context = context
+
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.shards: List[WsShard] = []
+        self.stream_shard: Dict[str, WsShard] = {}    # stream -> шард, который его держит
+        self.streams_per_connection: int = max(int(streams_per_connection), 1)
+        self.next_shard_id: int = 0
+
+        self.max_reconnect_attempts: int = 51
+        self.WEBSOCKET_URL: str = ws_url
+        self.last_symbol_progress = 0
+        # колбэк на закрытие минутной свечи: (symbol, open_time_ms, (o, h, l, c, v))
+        self.on_closed_bar: Optional[Callable] = None
+        # пачка последних тиков по символам, ещё не применённых к ws_price_data
+        self.pending_klines: Dict[str, dict] = {}
+        self.flush_scheduled: bool = False
+
+        # можно указать прокси
+        self.proxy_url: Optional[str] = proxy_url
+        self.proxy_auth: Optional[aiohttp.BasicAuth] = None
+
+    @staticmethod
+    def stream_name(symbol: str) -> str:
+        return f"{symbol.lower()}@kline_1m"
+
+    def feed_ws_message(self, message: str) -> None:
+        """
+        Декодирует кадр и кладёт его в пачку (по символу остаётся только последний тик).
+        Пачка разбирается одним проходом, когда сокеты опустеют и цикл событий освободится.
+        """
+        try:
+            msg = json_loads(message).get("data")
+            if not msg or msg.get("e") != "kline":
+                return
+
+            symbol = msg["s"]
+            kline = msg["k"]
+            if kline.get("x"):
+                # закрытие свечи не схлопываем: применяем сразу, вместе с более старым тиком из пачки
+                self.pending_klines.pop(symbol, None)
+                self.apply_kline(symbol, kline)
+                return
+
+            self.pending_klines[symbol] = kline
+            if not self.flush_scheduled:
+                self.flush_scheduled = True
+                asyncio.get_running_loop().call_soon(self.flush_ws_batch)
+        except Exception as e:
+            self.error_handler.debug_error_notes(f"[WS Handle] Error: {e}, Traceback: {traceback.format_exc()}")
+
+    def flush_ws_batch(self) -> None:
+        self.flush_scheduled = False
+        batch, self.pending_klines = self.pending_klines, {}
+        for symbol, kline in batch.items():
+            self.apply_kline(symbol, kline)
+
+    def apply_kline(self, symbol: str, kline: dict) -> None:
+        """Обновляет слот цены символа на месте (без нового словаря на каждый тик)."""
+        price_data = self.context.ws_price_data.get(symbol)
+        if price_data is None:
+            price_data = self.context.ws_price_data[symbol] = {}
+        price_data["close"] = float(kline["c"])
+        price_data["open"] = float(kline["o"])
+        price_data["high"] = float(kline["h"])
+        price_data["low"] = float(kline["l"])
+        price_data["volume"] = float(kline["v"])
+        price_data["open_time"] = int(kline["t"])
+
+        if kline.get("x") and self.on_closed_bar:
+            self.on_closed_bar(
+                symbol,
+                price_data["open_time"],
+                (price_data["open"], price_data["high"], price_data["low"], price_data["close"], price_data["volume"])
+            )
+        if symbol in self.context.price_watch_symbols:
+            self.context.publish_event("price", symbol=symbol)
+
+    async def sync_ws_streams(self, active_symbols: list) -> None:
+        """Приводит подписки шардов к списку символов: снимает лишние потоки, новые раскладывает по наименее загруженным шардам."""
+        wanted = {self.stream_name(symbol) for symbol in active_symbols}
+        current = set(self.stream_shard)
+        removed, added = current - wanted, wanted - current
+        if not removed and not added:
+            return
+
+        if not self.session:
+            # каждый шард держит слот пула всё время жизни: общий лимит не ставим (0), число шардов задают подписки
+            self.session = create_pooled_session(0)
+
+        unsubscribe_plan: Dict[WsShard, Set[str]] = {}
+        for stream in removed:
+            unsubscribe_plan.setdefault(self.stream_shard.pop(stream), set()).add(stream)
+        for shard, streams in unsubscribe_plan.items():
+            await shard.remove_streams(streams)
+
+        subscribe_plan: Dict[WsShard, Set[str]] = {}
+        for stream in sorted(added):
+            load = lambda sh: len(sh.streams) + len(subscribe_plan.get(sh, ()))
+            shard = min((sh for sh in self.shards if load(sh) < self.streams_per_connection), key=load, default=None)
+            if shard is None:
+                shard = WsShard(self, self.next_shard_id)
+                self.next_shard_id += 1
+                self.shards.append(shard)
+            subscribe_plan.setdefault(shard, set()).add(stream)
+            self.stream_shard[stream] = shard
+        for shard, streams in subscribe_plan.items():
+            await shard.add_streams(streams)
+
+        for shard in [sh for sh in self.shards if not sh.streams]:
+            await shard.stop()
+            self.shards.remove(shard)
 
     async def connect_to_websocket(self, symbols: List[str]) -> None:
         try:
             await self.stop_ws_process()
-            self.ws_shutdown_event.clear()
-            self.reconnect_attempts = 0
-            self.ws_task = asyncio.create_task(self.connect_and_handle(symbols))
+            await self.sync_ws_streams(symbols)
         except Exception as e:
             self.error_handler.debug_error_notes(f"[WS Connect] Failed: {e}, Traceback: {traceback.format_exc()}")
 
     async def restart_ws(self):
-        """Перезапускает вебсокет всегда, независимо от количества символов."""
+        """Перезапускает все шарды, независимо от количества символов."""
         try:
-            await self.stop_ws_process()
             await self.connect_to_websocket(list(self.context.fetch_symbols))
             self.error_handler.debug_info_notes("[WS] Вебсокет перезапущен")
         except Exception as e:
             self.error_handler.debug_error_notes(f"[WS Restart] Ошибка: {e}")
 
     async def stop_ws_process(self) -> None:
-        self.ws_shutdown_event.set()
-        if self.ws_task:
-            self.ws_task.cancel()
-            try:
-                await asyncio.wait_for(self.ws_task, timeout=5.0)
-            except (asyncio.TimeoutError, asyncio.CancelledError):
-                self.error_handler.debug_info_notes("WebSocket task cancelled or timed out")
-            finally:
-                self.ws_task = None
-                self.is_connected = False
-                self.error_handler.debug_info_notes("WebSocket process stopped")
-
-        if self.ws:
-            await self.ws.close()
-            self.ws = None
-
-    async def sync_ws_streams(self, active_symbols: list) -> None:
-        """Управляет состоянием WS в зависимости от списка активных символов."""
-        new_symbols_set = set(active_symbols)
-
-        if new_symbols_set != getattr(self, "last_symbols_set", set()):
-            self.last_symbols_set = new_symbols_set
-            if new_symbols_set:
-                await self.connect_to_websocket(list(new_symbols_set))
-            else:
-                await self.stop_ws_process()
+        for shard in self.shards:
+            await shard.stop()
+        if self.shards:
+            self.error_handler.debug_info_notes("WebSocket process stopped")
+        self.shards.clear()
+        self.stream_shard.clear()
 
     # async def reset_existing_prices(self, symbols: Iterable[str]) -> None:
     #     async with self.context.ws_async_lock:
     #         self.context.ws_price_data.update({s: {"close": None} for s in symbols})
+
+
+class UserDataStream:
+    """
+    User-data stream (listenKey) по каждому пользователю.
+    ACCOUNT_UPDATE / ORDER_TRADE_UPDATE отдаются в on_event, после каждого (пере)подключения
+    вызывается on_reconnect -- чтобы сверить позиции через REST.
+    """
+
+    def __init__(self, context: BotContext,
+                 error_handler: ErrorHandler,
+                 ws_url: str = "wss://fstream.binance.com/ws/",
+                 keepalive_interval: float = 30 * 60):
+        error_handler.wrap_foreign_methods(self)
+        self.error_handler = error_handler
+        self.context = context
+
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.WEBSOCKET_URL: str = ws_url
+        self.keepalive_interval: float = keepalive_interval
+        self.keepalive_retry_interval: float = 60
+        self.keepalive_max_failures: int = 3
+        self.max_reconnect_attempts: int = 51
+
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.alive: Dict[str, bool] = {}
+        self.event_tasks: Set[asyncio.Task] = set()
+        self.shutdown_event: asyncio.Event = asyncio.Event()
+
+        self.on_event: Optional[Callable] = None        # async (user_name, event)
+        self.on_reconnect: Optional[Callable] = None    # (user_name)
+
+    def is_alive(self, user_name: str) -> bool:
+        return self.alive.get(user_name, False)
+
+    async def start(self, user_names: Iterable[str]) -> None:
+        if not self.session:
+            # по долгоживущему соединению на пользователя: общий лимит не ставим (0)
+            self.session = create_pooled_session(0)
+        self.shutdown_event.clear()
+        for user_name in user_names:
+            if user_name not in self.tasks:
+                self.tasks[user_name] = asyncio.create_task(self.run_user(user_name))
+
+    async def keepalive(self, user_name: str) -> None:
+        """
+        Продление listenKey. Ошибка не завершает цикл: повтор через keepalive_retry_interval,
+        после keepalive_max_failures неудач подряд -- on_reconnect (сверка позиций через REST).
+        """
+        failures = 0
+        delay = self.keepalive_interval
+        while not self.shutdown_event.is_set():
+            await asyncio.sleep(delay)
+            try:
+                user_context = self.context.user_contexts[user_name]
+                ok = await user_context["binance_client"].keepalive_listen_key(user_context["connector"].session)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.error_handler.debug_error_notes(f"[UserData][{user_name}] keepalive: {e}")
+                ok = False
+
+            if ok:
+                failures = 0
+                delay = self.keepalive_interval
+                continue
+            failures += 1
+            delay = self.keepalive_retry_interval
+            if failures % self.keepalive_max_failures == 0:
+                self.error_handler.debug_error_notes(
+                    f"[UserData][{user_name}] listenKey не продлевается {failures} раз подряд, сверяем позиции через REST"
+                )
+                if self.on_reconnect:
+                    self.on_reconnect(user_name)
+
+    def dispatch(self, user_name: str, event: dict) -> None:
+        """События пользователя обрабатываются фоном, порядок сохраняет лок пользователя у получателя."""
+        if not self.on_event:
+            return
+        task = asyncio.create_task(self.on_event(user_name, event))
+        self.event_tasks.add(task)
+        task.add_done_callback(self.event_tasks.discard)
+
+    async def run_user(self, user_name: str) -> None:
+        reconnect_attempts = 0
+        while reconnect_attempts < self.max_reconnect_attempts and not self.shutdown_event.is_set():
+            websocket = None
+            keepalive_task = None
+            try:
+                user_context = self.context.user_contexts[user_name]
+                binance_client = user_context["binance_client"]
+                listen_key = await binance_client.create_listen_key(user_context["connector"].session)
+                if not listen_key:
+                    raise RuntimeError("listenKey не получен")
+
+                websocket = await self.session.ws_connect(
+                    f"{self.WEBSOCKET_URL}{listen_key}",
+                    proxy=binance_client.proxy_url,
+                    heartbeat=30
+                )
+                self.alive[user_name] = True
+                reconnect_attempts = 0
+                if self.on_reconnect:
+                    self.on_reconnect(user_name)
+                keepalive_task = asyncio.create_task(self.keepalive(user_name))
+
+                async for msg in websocket:
+                    if self.shutdown_event.is_set():
+                        break
+                    if msg.type == aiohttp.WSMsgType.TEXT:
+                        event = json_loads(msg.data)
+                        if event.get("e") == "listenKeyExpired":
+                            self.error_handler.debug_info_notes(f"[UserData][{user_name}] listenKey истёк, переподключаемся")
+                            break
+                        self.dispatch(user_name, event)
+                    elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                        break
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.error_handler.debug_error_notes(
+                    f"[UserData][{user_name}] {e}, attempt {reconnect_attempts + 1}/{self.max_reconnect_attempts}"
+                )
+            finally:
+                self.alive[user_name] = False
+                if keepalive_task:
+                    keepalive_task.cancel()
+                if websocket and not websocket.closed:
+                    await websocket.close()
+
+            if self.shutdown_event.is_set():
+                break
+            reconnect_attempts += 1
+            await asyncio.sleep(min(2 * reconnect_attempts, 10))
+
+        self.alive[user_name] = False
+        if not self.shutdown_event.is_set():
+            self.error_handler.debug_error_notes(f"[UserData][{user_name}] Max reconnect attempts reached, переходим на REST-опрос")
+
+    async def stop(self) -> None:
+        self.shutdown_event.set()
+        for task in self.tasks.values():
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError, Exception):
+                await task
+        self.tasks.clear()
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.session = None
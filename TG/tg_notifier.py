@@ -1,9 +1,11 @@
 import asyncio
 import aiohttp
+import contextlib
 from a_settings import *
 from b_context import BotContext
 from c_log import ErrorHandler, log_time
 from c_utils import milliseconds_to_datetime
+from MANAGERS.online import NetworkManager, LANE_NORMAL
 from typing import *
 import random
 import traceback
@@ -140,9 +142,11 @@ class TelegramNotifier(MessageFormatter):
             token: str,
             chat_ids: list[int],
             context: BotContext,
-            info_handler: ErrorHandler
+            info_handler: ErrorHandler,
+            connector: Optional[NetworkManager] = None
         ):
         super().__init__(context, info_handler)
+        self.connector = connector   # общий пул соединений; без него -- сессия на пачку
         self.token = token
         self.chat_ids = [x.strip() for x in chat_ids if x and isinstance(x, str)]
         self.base_tg_url = f"https://api.telegram.org/bot{self.token}"
@@ -199,7 +203,13 @@ class TelegramNotifier(MessageFormatter):
         Отправка сообщения с авто-реконнектом и повторными попытками.
         """
 
-        async def _try_send(session: aiohttp.ClientSession, chat_id):
+        def _post_session(session: Optional[aiohttp.ClientSession]):
+            # слот полосы normal на попытку: семафор и учёт здоровья общего пула
+            if self.connector is not None:
+                return self.connector.lane(LANE_NORMAL)
+            return contextlib.nullcontext(session)
+
+        async def _try_send(session: Optional[aiohttp.ClientSession], chat_id):
             if photo_bytes:
                 url = self.base_tg_url + self.send_photo_endpoint
                 data = aiohttp.FormData()
@@ -224,7 +234,7 @@ class TelegramNotifier(MessageFormatter):
             while not self.stop_bot:
                 attempt += 1
                 try:
-                    async with session.post(url, data=data, timeout=10) as resp:
+                    async with _post_session(session) as http, http.post(url, data=data, timeout=10) as resp:
                         if resp.status != 200:
                             err_text = await resp.text()
                             raise Exception(f"HTTP {resp.status}: {err_text}")
@@ -245,8 +255,13 @@ class TelegramNotifier(MessageFormatter):
                         return False
                     await asyncio.sleep(wait_time)
 
-        # Новый session для каждой пачки отправок
-        async with aiohttp.ClientSession() as session:
+        async def _send_all(session: Optional[aiohttp.ClientSession]):
             tasks = [_try_send(session, chat_id) for chat_id in self.chat_ids]
             results = await asyncio.gather(*tasks, return_exceptions=True)
             return all(r is True for r in results)
+
+        if self.connector is not None:
+            return await _send_all(None)
+
+        async with aiohttp.ClientSession() as session:
+            return await _send_all(session)
@@ -161,14 +161,30 @@ TG_BOT_ID: str = "610822492" # -- id бота
 FILTER_WINDOW: str = "5m" # (1m, 2m, 3m, 4m, 5m, 15m, 30m, 1h, 2h, 4h, 12h, 1d)
 
 # ----------- UTILS ---------------
-WAIT_CLOSE_CANDLE: int = 5                  # sec. Ожидаем формирования новой свечи
+WAIT_CLOSE_CANDLE: int = 5                  # sec. Максимум ждём закрытую свечу из WS, затем догружаем через REST
 TZ_STR: str = "Europe/Berlin"               # часовой пояс ("Europe/Berlin")
 MAX_LOG_LINES: int = 1001                   # количество строк в лог файлах
 
 # --------- SYSTEM ----------------
 USE_CACHE: bool = False                    # использовать кеш для восстановления позиции. При деплое на сервер можно отключить 
-POS_UPDATE_FREQUENCY: float = 1.2         # seconds. частота обновления позиций при контроле состояния позиций
-MAIN_CYCLE_FREQUENCY: float = 1.0          # seconds. частота работы главного цикла
+USE_KLINES_CACHE: bool = True              # хранить историю свечей на диске (быстрый рестарт, догрузка только пропущенного)
+KLINES_CACHE_DIR: str = ""                 # папка кеша свечей ("" -- INFO/KLINES)
+EXCHANGE_INFO_TTL: float = 3600.0          # seconds. срок жизни кеша exchangeInfo (на диске и фоновое обновление)
+INDICATORS_STREAMING: bool = False         # False -- TREND_EMA/STOCHRSI пересчитываются numba-ядрами по окну кеша (klines_lim) раз на свечу: стоимость растёт с klines_lim.
+                                           # True -- инкрементально (O(1) на закрытый бар), но история копится с момента старта: значения НЕ совпадают с расчётом по окну.
+POS_UPDATE_FREQUENCY: float = 1.2         # seconds. частота REST-опроса позиций, если user-data stream недоступен
+POS_RECONCILE_INTERVAL: float = 60.0       # seconds. REST-сверка позиций при живом user-data stream
+MAIN_IDLE_TIMEOUT: float = 5.0             # seconds. максимальный простой главного цикла без событий (страховочный полный проход)
+WS_STREAMS_PER_CONNECTION: int = 50         # максимум потоков на одно WS-соединение (шард)
+
+# --------- HTTP POOL -------------
+HTTP_LIMIT_PER_HOST: int = 0               # макс. соединений на хост в одной полосе (0 -- только общий лимит полосы)
+HTTP_DNS_TTL: int = 300                    # seconds. кеш DNS
+HTTP_KEEPALIVE_TIMEOUT: float = 30.0       # seconds. сколько держать простаивающее соединение открытым
+HTTP_CONNECT_TIMEOUT: float = 10.0         # seconds. установка соединения (TCP+TLS, CONNECT прокси)
+HTTP_TOTAL_TIMEOUT: float = 30.0           # seconds. весь запрос целиком
+HTTP_MAX_FAILURES: int = 3                 # подряд неудачных запросов -- соединение нездорово, пересоздаём в фоне
+HTTP_REBUILD_COOLDOWN: float = 10.0        # seconds. не пересоздавать пулы чаще этого
 
 # --- STYLES ---
 HEAD_WIDTH = 35
@@ -1,7 +1,164 @@
 import asyncio
-from typing import  Dict, Set
+import numpy as np
+from typing import  Callable, Dict, List, Optional, Set, Tuple
 from a_settings import FILTER_WINDOW
 
+
+class PositionsRegistry:
+    """
+    Колоночное зеркало position_vars для векторных проходов по всем позициям.
+    Строка -- (user_name, strategy_name, symbol, side). Источник истины остаётся в position_vars:
+    словари позиций (PositionSlot) сами пишут сюда изменения отслеживаемых полей.
+    """
+    float_fields = ("avg_price", "entry_price", "comul_qty", "avg_progress_counter", "trailing_sl_progress_counter", "success")
+
+    def __init__(self, capacity: int = 64):
+        self.capacity = capacity
+        self.size = 0
+        self.index: Dict[Tuple[str, str, str, str], int] = {}
+        self.keys: List[Tuple[str, str, str, str]] = []     # row -> ключ
+        self.users: List[str] = []
+        self.symbols: List[str] = []
+        self.user_ids: Dict[str, int] = {}
+        self.symbol_ids: Dict[str, int] = {}
+
+        self.user_idx = np.zeros(capacity, dtype=np.int32)
+        self.symbol_idx = np.zeros(capacity, dtype=np.int32)
+        self.is_long = np.zeros(capacity, dtype=bool)
+        self.in_position = np.zeros(capacity, dtype=bool)
+        self.columns: Dict[str, np.ndarray] = {"in_position": self.in_position}
+        for field in self.float_fields:
+            self.columns[field] = np.full(capacity, np.nan)
+
+    def _grow(self) -> None:
+        self.capacity *= 2
+        for name in ("user_idx", "symbol_idx", "is_long", "in_position"):
+            old = getattr(self, name)
+            new = np.zeros(self.capacity, dtype=old.dtype)
+            new[:old.size] = old
+            setattr(self, name, new)
+        self.columns["in_position"] = self.in_position
+        for field in self.float_fields:
+            old = self.columns[field]
+            new = np.full(self.capacity, np.nan)
+            new[:old.size] = old
+            self.columns[field] = new
+
+    @staticmethod
+    def _intern(name: str, names: List[str], ids: Dict[str, int]) -> int:
+        idx = ids.get(name)
+        if idx is None:
+            idx = ids[name] = len(names)
+            names.append(name)
+        return idx
+
+    def row(self, user_name: str, strategy_name: str, symbol: str, side: str) -> int:
+        key = (user_name, strategy_name, symbol, side)
+        row = self.index.get(key)
+        if row is not None:
+            return row
+        if self.size == self.capacity:
+            self._grow()
+        row = self.index[key] = self.size
+        self.keys.append(key)
+        self.size += 1
+        self.user_idx[row] = self._intern(user_name, self.users, self.user_ids)
+        self.symbol_idx[row] = self._intern(symbol, self.symbols, self.symbol_ids)
+        self.is_long[row] = side == "LONG"
+        return row
+
+    def store(self, row: int, field: str, value) -> None:
+        column = self.columns.get(field)
+        if column is None:
+            return
+        if field == "in_position":
+            column[row] = bool(value)
+        else:
+            column[row] = np.nan if value is None else float(value)
+
+    def bind(self, symbol_data: dict, user_name: str, strategy_name: str, symbol: str) -> None:
+        """Подменяет словари сторон (и martin-сторон) символа на PositionSlot, привязанные к строкам реестра."""
+        martin = symbol_data.get("martin")
+        for side in ("LONG", "SHORT"):
+            pos_data = symbol_data.get(side)
+            if pos_data is None:
+                continue
+            row = self.row(user_name, strategy_name, symbol, side)
+            if not isinstance(pos_data, PositionSlot):
+                symbol_data[side] = PositionSlot(self, row, pos_data)
+            if isinstance(martin, dict) and isinstance(martin.get(side), dict) and not isinstance(martin[side], PositionSlot):
+                martin[side] = PositionSlot(self, row, martin[side])
+
+    def count_active(self) -> Tuple[Dict[str, int], Dict[str, int], Set[str]]:
+        n = self.size
+        active = self.in_position[:n]
+        user_idx = self.user_idx[:n]
+        is_long = self.is_long[:n]
+        longs = np.bincount(user_idx[active & is_long], minlength=len(self.users))
+        shorts = np.bincount(user_idx[active & ~is_long], minlength=len(self.users))
+        long_count = {user: int(longs[i]) for i, user in enumerate(self.users)}
+        short_count = {user: int(shorts[i]) for i, user in enumerate(self.users)}
+        active_symbols = {self.symbols[i] for i in np.unique(self.symbol_idx[:n][active])}
+        return long_count, short_count, active_symbols
+
+    def has_failed(self) -> bool:
+        return bool((self.columns["success"][:self.size] == -1).any())
+
+    def prices(self, ws_price_data: dict) -> np.ndarray:
+        """Текущая цена для каждой строки (NaN, если цены нет)."""
+        symbol_prices = np.array(
+            [ws_price_data.get(symbol, {}).get("close") for symbol in self.symbols],
+            dtype=np.float64
+        ) if self.symbols else np.empty(0)
+        return symbol_prices[self.symbol_idx[:self.size]]
+
+    def nPnL_open(self, ws_price_data: dict, base_field: str = "avg_price") -> Tuple[np.ndarray, np.ndarray]:
+        """(строки открытых позиций, % изменения цены относительно base_field) одним проходом."""
+        n = self.size
+        cur_price = self.prices(ws_price_data)
+        init_price = self.columns[base_field][:n]
+        rows = np.flatnonzero(self.in_position[:n] & (cur_price > 0) & (init_price > 0))
+        return rows, (cur_price[rows] - init_price[rows]) / init_price[rows] * 100
+
+
+class PositionSlot(dict):
+    """Словарь позиции/мартина, зеркалирующий отслеживаемые поля в строку PositionsRegistry."""
+    __slots__ = ("registry", "row")
+
+    def __init__(self, registry: PositionsRegistry, row: int, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.registry = registry
+        self.row = row
+        for key, value in self.items():
+            registry.store(row, key, value)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.registry.store(self.row, key, value)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.registry.store(self.row, key, None)
+
+    def pop(self, key, *default):
+        value = super().pop(key, *default)
+        self.registry.store(self.row, key, None)
+        return value
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def __reduce__(self):
+        # в кэш (pickle/deepcopy) уходит обычный dict
+        return (dict, (dict(self),))
+
+
 class BotContext:
     def __init__(self):
         """ Инициализируем глобальные структуры"""
@@ -12,6 +169,7 @@ class BotContext:
 
         # Статическая информация
         self.symbol_info: dict = {}
+        self.symbol_specs: dict = {}   # symbol -> SymbolSpec (индекс exchangeInfo)
         self.fetch_symbols: Set[str] = set()
         # self.klines_lim: int = 0
         self.cron_cycle_interval: str = "1m"
@@ -26,6 +184,7 @@ class BotContext:
         # Переменные позиции
         self.first_update_done: dict[str, bool] = {}
         self.position_vars: dict = {}
+        self.positions_registry: PositionsRegistry = PositionsRegistry()
         self.dinamik_risk_data: dict = {}
         self.ws_price_data: Dict[str, Dict[str, float]] = {}    
         self.anti_double_close: dict = {}
@@ -33,6 +192,68 @@ class BotContext:
         self.ukik_suffics_data: dict = {}
         self.report_list = []
 
+        # События для главного цикла: (kind, user_name | None, symbol | None). None — "все".
+        # kind: "price" -- тик цены, "position" -- изменение позиции, "candle" -- новая свеча
+        self.pending_events: Set[Tuple[str, Optional[str], Optional[str]]] = set()
+        self.price_watch_symbols: Set[str] = set()  # тики каких символов будят главный цикл
+        self.events_signal: asyncio.Event = asyncio.Event()
+
+        # Ожидающие изменения позиции (user_name, strategy_name, symbol, side) -> futures
+        self.position_waiters: Dict[Tuple[str, str, str, str], Set[asyncio.Future]] = {}
+
         # Ссылки на глобальные объекты
         self.async_lock: asyncio.Lock = asyncio.Lock()
-        self.ws_async_lock: asyncio.Lock = asyncio.Lock()
\ No newline at end of file
+        self.ws_async_lock: asyncio.Lock = asyncio.Lock()
+
+    def publish_event(self, kind: str, user_name: Optional[str] = None, symbol: Optional[str] = None) -> None:
+        """Сообщает главному циклу, что состояние (user_name, symbol) изменилось."""
+        self.pending_events.add((kind, user_name, symbol))
+        self.events_signal.set()
+
+    def notify_position(self, user_name: str, strategy_name: str, symbol: str, side: str) -> None:
+        """Будит всех, кто ждёт изменения этой позиции."""
+        for future in self.position_waiters.pop((user_name, strategy_name, symbol, side), ()):
+            if not future.done():
+                future.set_result(True)
+
+    async def wait_position(
+            self,
+            user_name: str,
+            strategy_name: str,
+            symbol: str,
+            side: str,
+            is_ready: Callable[[dict], bool],
+            timeout: float
+        ) -> bool:
+        """
+        Ждёт, пока данные позиции удовлетворят is_ready (проверка -- при каждом notify_position).
+        False -- не дождались за timeout.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        key = (user_name, strategy_name, symbol, side)
+        while True:
+            pos_data = self.position_vars.get(user_name, {}).get(strategy_name, {}).get(symbol, {}).get(side, {})
+            if is_ready(pos_data):
+                return True
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            future = loop.create_future()
+            waiters = self.position_waiters.setdefault(key, set())
+            waiters.add(future)
+            try:
+                await asyncio.wait_for(future, timeout=remaining)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                waiters.discard(future)
+                if not waiters and self.position_waiters.get(key) is waiters:
+                    del self.position_waiters[key]
+
+    def drain_events(self) -> Set[Tuple[str, Optional[str], Optional[str]]]:
+        """Забирает накопленные события и сбрасывает сигнал."""
+        events = self.pending_events
+        self.pending_events = set()
+        self.events_signal.clear()
+        return events
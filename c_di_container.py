@@ -1,13 +1,14 @@
 # c_di_container.py
 from typing import *
+from a_settings import USE_KLINES_CACHE, KLINES_CACHE_DIR
 from b_context import BotContext
 from c_initializer import BaseDataInitializer, PositionVarsSetup
 from c_log import ErrorHandler
 from c_utils import PositionUtils, TimingUtils
-from c_validators import TimeframeValidator, OrderValidator
+from c_validators import TimeframeValidator, OrderValidator, PreTradeValidator
 from d_bapi import BinancePublicApi
-from MANAGERS.online import WebSocketManager
-from MANAGERS.offline import KlinesCacheManager, WriteLogManager
+from MANAGERS.online import WebSocketManager, UserDataStream
+from MANAGERS.offline import KlinesCacheManager, KlinesDiskStore, WriteLogManager
 from BUSINESS.signals import SIGNALS
 from BUSINESS.risk_orders_control import RiskOrdersControl
 
@@ -83,8 +84,13 @@ def setup_dependencies_second(container, config: dict):
         error_handler=error_handler,
         proxy_url=proxy_url
     ), singleton=True)
+    container.register("user_data_stream", lambda: UserDataStream(
+        context=context,
+        error_handler=error_handler
+    ), singleton=True)
     container.register("time_frame_validator", lambda: TimeframeValidator(error_handler), singleton=True)
     container.register("order_validator", lambda: OrderValidator(error_handler), singleton=True)    
+    container.register("pre_trade_validator", lambda: PreTradeValidator(context, error_handler), singleton=True)
     container.register("binance_public", lambda: BinancePublicApi(error_handler, None), singleton=True)
 
 def setup_dependencies_third(container, config: dict):
@@ -93,10 +99,17 @@ def setup_dependencies_third(container, config: dict):
     get_klines: callable = config.get("get_klines")
     time_frame_validator: TimeframeValidator = config.get("time_frame_validator")
     pos_utils: PositionUtils = config.get("pos_utils")
+    container.register("klines_disk_store", lambda: KlinesDiskStore(
+        error_handler,
+        KLINES_CACHE_DIR or None
+        ),
+        singleton=True
+    )
     container.register("klines_cache_manager", lambda: KlinesCacheManager(
         context,
         error_handler,
-        get_klines
+        get_klines,
+        container.get("klines_disk_store") if USE_KLINES_CACHE else None
         ),
         singleton=True
     )
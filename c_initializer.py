@@ -274,11 +274,11 @@ class PositionVarsSetup:
             "c_time": None
         }
             
-    def set_pos_defaults(self, symbol_data, symbol, pos_type):
+    def set_pos_defaults(self, symbol_data, symbol, pos_type, user_name=None, strategy_name=None):
         """Безопасная инициализация структуры данных контроля позиций."""
         qty_prec, price_prec = None, None
         try:
-            precisions = self.pos_utils.get_qty_precisions(self.context.symbol_info, symbol)
+            precisions = self.pos_utils.get_qty_precisions(symbol)
             if isinstance(precisions, (list, tuple)) and len(precisions) >= 2:
                 qty_prec, price_prec = precisions[0], precisions[1]
             else:
@@ -310,6 +310,8 @@ class PositionVarsSetup:
 
         # Убедимся, что pos_type существует в данных символа
         symbol_data.setdefault(pos_type, {}).update(self.pos_vars_root_template())
+        if user_name is not None and strategy_name is not None:
+            self.context.positions_registry.bind(symbol_data, user_name, strategy_name, symbol)
         return True
 
     def setup_pos_vars(self):
@@ -333,7 +335,7 @@ class PositionVarsSetup:
                 for pos_type in ["LONG", "SHORT"]:
                     for symbol in symbols.copy():
                         symbol_data = self.context.position_vars[user_name][strategy_name].setdefault(symbol, {})
-                        if not self.set_pos_defaults(symbol_data, symbol, pos_type):
+                        if not self.set_pos_defaults(symbol_data, symbol, pos_type, user_name, strategy_name):
                             bad_symbols.add(symbol)
                             break
 
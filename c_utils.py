@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
 import re
 from datetime import datetime, timezone
 from b_context import BotContext
@@ -10,6 +10,50 @@ getcontext().prec = 28  # точность Decimal
 
 PRECISION = 28
 
+class SymbolSpec(NamedTuple):
+    """Сжатая запись exchangeInfo по символу."""
+    step_size: float
+    tick_size: float
+    min_qty: float
+    max_qty: float
+    market_max_qty: float
+    min_notional: float
+    qty_precision: int
+    price_precision: int
+    status: str
+
+
+def count_decimal_places(number_str: str) -> int:
+    if '.' in number_str:
+        return len(number_str.rstrip('0').split('.')[-1])
+    return 0
+
+
+def build_symbol_index(exchange_info: dict) -> Dict[str, SymbolSpec]:
+    """exchangeInfo -> {symbol: SymbolSpec}. Символы без LOT_SIZE/PRICE_FILTER пропускаются."""
+    index = {}
+    for item in (exchange_info or {}).get("symbols", []):
+        filters = {f.get("filterType"): f for f in item.get("filters", [])}
+        lot_size = filters.get("LOT_SIZE")
+        price_filter = filters.get("PRICE_FILTER")
+        if not lot_size or not price_filter:
+            continue
+        market_lot = filters.get("MARKET_LOT_SIZE") or lot_size
+        min_notional = filters.get("MIN_NOTIONAL", {})
+        index[item["symbol"]] = SymbolSpec(
+            step_size=float(lot_size["stepSize"]),
+            tick_size=float(price_filter["tickSize"]),
+            min_qty=float(lot_size.get("minQty", 0.0)),
+            max_qty=float(lot_size.get("maxQty", 0.0)),
+            market_max_qty=float(market_lot.get("maxQty", 0.0)),
+            min_notional=float(min_notional.get("notional", min_notional.get("minNotional", 0.0))),
+            qty_precision=count_decimal_places(lot_size["stepSize"]),
+            price_precision=count_decimal_places(price_filter["tickSize"]),
+            status=item.get("status", ""),
+        )
+    return index
+
+
 def format_duration(ms: int) -> str:
     """
     Конвертирует миллисекундную разницу в формат "Xh Ym" или "Xm" или "Xs".
@@ -122,74 +166,24 @@ class PositionUtils:
             print(f"{dubug_label}. Параметр direction задан неверно")
         return result
 
-    @staticmethod
-    def count_active_symbols(position_vars: Dict) -> Tuple[int, int, Set[str]]:
+    def count_active_symbols(self) -> Tuple[Dict[str, int], Dict[str, int], Set[str]]:
         """
-        Подсчитывает активные символы и количество LONG/SHORT позиций.
+        Подсчитывает активные символы и количество LONG/SHORT позиций по пользователям.
         """
-        if not isinstance(position_vars, dict):
-            raise TypeError("position_vars must be a dictionary")
-
-        active_symbols: Set[str] = set()
-        long_count = {}
-        short_count = {}
-
-        for user_name, strategies in position_vars.items():
-            long_count[user_name] = 0
-            short_count[user_name] = 0
-            if not isinstance(strategies, dict):
-                continue
-
-            for strategy_data in strategies.values():  # volf_stoch → {...}
-                for symbol, symbol_data in strategy_data.items():  # BRUSDT → {...}
-                    symbol_active = False
-                    for pos_type, pos_data in symbol_data.items():  # LONG / SHORT
-                        if not isinstance(pos_data, dict):
-                            continue
-                        if pos_data.get("in_position", False):
-                            symbol_active = True
-                            if pos_type == "LONG":
-                                long_count[user_name] += 1
-                            elif pos_type == "SHORT":
-                                short_count[user_name] += 1
-                    if symbol_active:
-                        active_symbols.add(symbol)
-
-        return long_count, short_count, active_symbols
+        return self.context.positions_registry.count_active()
     
     def has_any_failed_position(self) -> bool:
         """Есть ли хотя бы одна позиция с success == -1"""
-        for user_name, strategies in self.context.position_vars.items():
-            for strategy_name, symbols in strategies.items():
-                for symbol, symbol_data in symbols.items():
-                    martin_data = symbol_data.get("martin", {})
-                    for position_side in ("LONG", "SHORT"):
-                        pos_martin = martin_data.get(position_side, {})
-                        if pos_martin.get("success") == -1:
-                            return True
-        return False
+        return self.context.positions_registry.has_failed()
     
-    @staticmethod
-    def get_qty_precisions(symbol_info, symbol):
-        symbol_data = next((item for item in symbol_info["symbols"] if item['symbol'] == symbol), None)
-        if not symbol_data:
-            return
-
-        lot_size_filter = next((f for f in symbol_data["filters"] if f["filterType"] == "LOT_SIZE"), None)
-        price_filter = next((f for f in symbol_data["filters"] if f["filterType"] == "PRICE_FILTER"), None)
+    def get_symbol_spec(self, symbol: str) -> Optional[SymbolSpec]:
+        return self.context.symbol_specs.get(symbol)
 
-        if not lot_size_filter or not price_filter:
+    def get_qty_precisions(self, symbol: str) -> Optional[Tuple[int, int]]:
+        spec = self.context.symbol_specs.get(symbol)
+        if not spec:
             return
-
-        def count_decimal_places(number_str):
-            if '.' in number_str:
-                return len(number_str.rstrip('0').split('.')[-1])
-            return 0
-
-        qty_precission = count_decimal_places(lot_size_filter['stepSize'])
-        price_precision = count_decimal_places(price_filter['tickSize'])
-
-        return qty_precission, price_precision
+        return spec.qty_precision, spec.price_precision
 
     def size_calc(
         self,
@@ -294,4 +288,11 @@ class TimingUtils:
             self.last_fetch_timestamp = nearest_timestamp
             return True
 
-        return False
\ No newline at end of file
+        return False
+
+    def seconds_to_next(self) -> float:
+        """
+        Сколько секунд осталось до следующей метки времени, кратной интервалу.
+        """
+        now = datetime.now(timezone.utc).timestamp()
+        return self.interval_seconds - (now % self.interval_seconds)
\ No newline at end of file
@@ -1,4 +1,6 @@
 from datetime import datetime
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_UP
+from typing import Optional
 import pandas as pd
 import re
 from c_log import ErrorHandler, log_time
@@ -216,6 +218,95 @@ class OrderValidator:
         return False
 
 
+class PreTradeValidator:
+    """
+    Проверка ордера по фильтрам exchangeInfo (context.symbol_specs) до отправки на биржу.
+    Подгоняет qty под stepSize/maxQty и цену под tickSize, отклоняет то, что биржа точно не примет.
+    saved_round_trips -- сколько заведомо неудачных запросов не ушло в сеть.
+    """
+    def __init__(self, context, error_handler: ErrorHandler):
+        error_handler.wrap_foreign_methods(self)
+        self.error_handler = error_handler
+        self.context = context
+        self.saved_round_trips: int = 0
+        self.adjusted: int = 0
+
+    @staticmethod
+    def _to_step(value: float, step: float, rounding) -> float:
+        if not step:
+            return value
+        step_dec = Decimal(str(step))
+        return float((Decimal(str(value)) / step_dec).to_integral_value(rounding) * step_dec)
+
+    def _reject(self, debug_label: str, reason: str) -> None:
+        self.saved_round_trips += 1
+        self.error_handler.debug_info_notes(f"[PRE_TRADE]{debug_label} ордер не отправлен: {reason}")
+
+    def check_market_order(
+        self,
+        symbol: str,
+        qty: float,
+        price: Optional[float],
+        is_closing: bool,
+        debug_label: str = "",
+        is_limit: bool = False
+    ) -> Optional[float]:
+        """
+        Итоговое qty для MARKET-ордера или None, если отправлять нельзя.
+        is_limit -- лимитный ордер: потолок qty из LOT_SIZE, а не MARKET_LOT_SIZE.
+        """
+        spec = self.context.symbol_specs.get(symbol)
+        if spec is None:
+            return qty  # нет метаданных -- решает биржа
+        if spec.status and spec.status != "TRADING":
+            self._reject(debug_label, f"статус символа {spec.status}")
+            return None
+
+        new_qty = self._to_step(abs(qty), spec.step_size, ROUND_DOWN)
+        max_qty = spec.max_qty if is_limit else (spec.market_max_qty or spec.max_qty)
+        if max_qty and new_qty > max_qty:
+            new_qty = self._to_step(max_qty, spec.step_size, ROUND_DOWN)
+        if new_qty <= 0 or new_qty < spec.min_qty:
+            self._reject(debug_label, f"qty {qty} < minQty {spec.min_qty}")
+            return None
+        # закрытие позиции биржа принимает и ниже minNotional
+        if not is_closing and price and spec.min_notional and new_qty * price < spec.min_notional:
+            self._reject(debug_label, f"notional {new_qty * price:.4f} < minNotional {spec.min_notional}")
+            return None
+
+        if new_qty != qty:
+            self.adjusted += 1
+        return new_qty
+
+    def check_risk_order(
+        self,
+        symbol: str,
+        qty: float,
+        target_price: float,
+        is_limit: bool,
+        debug_label: str = ""
+    ) -> Optional[tuple[float, float]]:
+        """(qty, price) для SL/TP-ордера или None. Цена -- к ближайшему tickSize."""
+        if not target_price or target_price <= 0:
+            self._reject(debug_label, f"цена {target_price}")
+            return None
+        spec = self.context.symbol_specs.get(symbol)
+        if spec is None:
+            return qty, target_price
+
+        new_price = self._to_step(target_price, spec.tick_size, ROUND_HALF_UP)
+        new_qty = qty
+        if is_limit:
+            # лимитный TP идёт с quantity (SL/TP-market -- closePosition)
+            new_qty = self.check_market_order(symbol, qty, new_price, True, debug_label, is_limit=True)
+            if new_qty is None:
+                return None
+
+        if new_price != target_price:
+            self.adjusted += 1
+        return new_qty, new_price
+
+
 class HTTP_Validator:
     def __init__(self, error_handler: ErrorHandler):    
         error_handler.wrap_foreign_methods(self)
@@ -2,16 +2,112 @@ import aiohttp
 import time
 import hmac
 import hashlib
+import numpy as np
 import pandas as pd
 import asyncio
 import inspect
 import random
+import json
+import contextlib
 from typing import *
 from c_log import ErrorHandler, log_time
+from c_utils import TimingUtils
 from c_validators import HTTP_Validator
+from d_limits import (
+    RateLimiter, shared_limiter, klines_weight,
+    PRIORITY_ORDERS, PRIORITY_POSITIONS, PRIORITY_KLINES
+)
+from MANAGERS.online import NetworkManager, LANE_CRITICAL, LANE_NORMAL, LANE_BULK
 # from pytz.tzinfo import BaseTzInfo
 
 
+@contextlib.asynccontextmanager
+async def lane_session(network: Optional[NetworkManager], session: Optional[aiohttp.ClientSession], lane: str):
+    """
+    Сессия полосы lane из network. Без network -- переданная сессия как есть
+    (или временная, если и её нет).
+    """
+    if network is not None:
+        async with network.lane(lane) as lane_sess:
+            yield lane_sess
+    elif session is not None:
+        yield session
+    else:
+        async with aiohttp.ClientSession() as temp_session:
+            yield temp_session
+
+
+class KlinesArrays:
+    """
+    Свечи в колонках NumPy: times -- open time (int64, ms), values -- float64 (N x len(columns)).
+    DataFrame строится лениво и только по запросу (to_dataframe).
+    """
+    OHLCV = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+    def __init__(self, times: np.ndarray, values: np.ndarray, columns: List[str]):
+        self.times = times
+        self.values = values
+        self.columns = list(columns)
+        self._df: Optional[pd.DataFrame] = None
+
+    @classmethod
+    def empty_like(cls, columns: List[str] = None) -> "KlinesArrays":
+        columns = columns or cls.OHLCV
+        return cls(np.empty(0, dtype=np.int64), np.empty((0, len(columns)), dtype=np.float64), columns)
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @property
+    def empty(self) -> bool:
+        return not len(self.times)
+
+    def column(self, name: str) -> np.ndarray:
+        return self.values[:, self.columns.index(name)]
+
+    def tail(self, n: int) -> "KlinesArrays":
+        if n >= len(self.times):
+            return self
+        return KlinesArrays(self.times[-n:], self.values[-n:], self.columns)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        if self._df is None:
+            df = pd.DataFrame(self.values, columns=self.columns)
+            df.index = pd.to_datetime(self.times, unit='ms')
+            df.index.name = 'Time'
+            self._df = df
+        return self._df
+
+
+def parse_klines(pages: List[list], with_quote: bool = False) -> KlinesArrays:
+    """
+    Ответы /klines (страницы от старых к новым) -> KlinesArrays без промежуточного DataFrame.
+    Колонки: 0 - open time, 1..5 - OHLCV, 7 - quote volume.
+    """
+    columns = KlinesArrays.OHLCV + (['QuoteVolume'] if with_quote else [])
+    total = sum(len(page) for page in pages)
+    times = np.empty(total, dtype=np.int64)
+    values = np.empty((total, len(columns)), dtype=np.float64)
+
+    pos = 0
+    for page in pages:
+        end = pos + len(page)
+        times[pos:end] = [row[0] for row in page]
+        values[pos:end, :5] = [row[1:6] for row in page]
+        if with_quote:
+            values[pos:end, 5] = [row[7] for row in page]
+        pos = end
+
+    if total > 1 and not (np.diff(times) > 0).all():
+        # стык страниц: сортируем и убираем дубли (оставляем последнюю версию свечи)
+        order = np.argsort(times, kind="stable")
+        times, values = times[order], values[order]
+        keep = np.append(times[1:] != times[:-1], True)
+        times, values = times[keep], values[keep]
+    np.abs(values[:, 4], out=values[:, 4])  # делаем объём положительным
+    return KlinesArrays(times, values, columns)
+
+
 class BinancePublicApi:
     def __init__(self, error_handler: ErrorHandler, proxy_url: str = None):    
         error_handler.wrap_foreign_methods(self)
@@ -22,12 +118,16 @@ class BinancePublicApi:
         self.price_url = "https://fapi.binance.com/fapi/v1/ticker/price"
 
         self.proxy_url = proxy_url
+        self.limiter: RateLimiter = shared_limiter
+        self.network: Optional[NetworkManager] = None   # полосы запросов
     
     # publis methods:    
     async def get_exchange_info(self, session: aiohttp.ClientSession):
         params = {'recvWindow': 20000}
         try:    
-            async with session.get(self.exchangeInfo_url, params=params, proxy=self.proxy_url) as response:            
+            await self.limiter.acquire("exchangeInfo", PRIORITY_KLINES, self.proxy_url)
+            async with lane_session(self.network, session, LANE_BULK) as session, session.get(self.exchangeInfo_url, params=params, proxy=self.proxy_url) as response:            
+                self.limiter.update_from_response(response, self.proxy_url)
                 if response.status != 200:
                     self.error_handler.debug_error_notes(f"Failed to fetch positions: {response.status}")
                 return await response.json()  
@@ -38,7 +138,10 @@ class BinancePublicApi:
         """Возвращает текущую (горячую) цену по символу с Binance Futures"""
         params = {'symbol': symbol.upper()}
         try:
-            async with session.get(self.price_url, params=params, proxy=self.proxy_url) as response:
+            # цена нужна для выставления ордера -- приоритет ордеров
+            await self.limiter.acquire("ticker/price", PRIORITY_ORDERS, self.proxy_url)
+            async with lane_session(self.network, session, LANE_CRITICAL) as session, session.get(self.price_url, params=params, proxy=self.proxy_url) as response:
+                self.limiter.update_from_response(response, self.proxy_url)
                 if response.status != 200:
                     self.error_handler.debug_error_notes(
                         f"Failed to fetch price for {symbol}: {response.status}"
@@ -52,69 +155,78 @@ class BinancePublicApi:
             )
             return None
 
+    @staticmethod
+    def klines_pages_plan(interval: str, limit: int, end_time: int, max_limit: int = 1000) -> List[dict]:
+        """
+        Окна всех страниц истории заранее: страница i заканчивается на end_time - i * max_limit интервалов.
+        Последняя (самая старая) страница берёт только остаток.
+        """
+        interval_ms = TimingUtils.interval_to_seconds(interval) * 1000
+        plan = []
+        remaining, page_end = limit, end_time
+        while remaining > 0:
+            fetch_limit = min(max_limit, remaining)
+            plan.append({"endTime": page_end, "limit": fetch_limit})
+            page_end -= max_limit * interval_ms
+            remaining -= fetch_limit
+        return plan
+
+    async def _fetch_klines_page(
+            self,
+            session: aiohttp.ClientSession,
+            symbol: str,
+            interval: str,
+            page: dict,
+            headers: dict
+        ) -> list:
+        params = {"symbol": symbol, "interval": interval, **page}
+        await self.limiter.acquire("klines", PRIORITY_KLINES, self.proxy_url, weight=klines_weight(page["limit"]))
+        async with lane_session(self.network, session, LANE_BULK) as session, session.get(self.klines_url, params=params, headers=headers, proxy=self.proxy_url) as response:
+            self.limiter.update_from_response(response, self.proxy_url)
+            if response.status != 200:
+                self.error_handler.debug_error_notes(f"Failed to fetch klines: {response.status}, symbol: {symbol}, {await response.text()}")
+                return []
+            return await response.json() or []
+
     async def get_klines(
             self,
             session: aiohttp.ClientSession,
             symbol: str,
             interval: str,
             limit: int,
-            api_key: str = None
+            api_key: str = None,
+            start_time: int = None
         ):
         """
-        Загружает до 2500 и более минутных свечей, если limit > 1000 — разбивает на части с использованием endTime.
+        Загружает limit свечей. Если limit > 1000 — окна всех страниц считаются заранее
+        и запрашиваются параллельно (в рамках бюджета лимитера), затем склеиваются без дублей.
+        Если задан start_time — догружает не более 1000 свечей начиная с start_time (включительно).
         """
         MAX_LIMIT = 1000
-        all_data = []
-
-        headers = {"X-MBX-APIKEY": api_key} if api_key else {}
-        end_time = int(time.time() * 1000)  # текущее время в мс
-        remaining = limit
 
         if limit <= 0:
-            self.error_handler.debug_error_notes(f"{ex} in {inspect.currentframe().f_code.co_name}")
-            return pd.DataFrame(columns=['Time', 'Open', 'High', 'Low', 'Close', 'Volume'])
-        
-        base_sleep = 0.1  
-        try:
-            while remaining > 0:
-                fetch_limit = min(MAX_LIMIT, remaining)
-                params = {
-                    "symbol": symbol,
-                    "interval": interval,
-                    "limit": fetch_limit,
-                    "endTime": end_time
-                }
-
-                async with session.get(self.klines_url, params=params, headers=headers, proxy=self.proxy_url) as response:
-                    if response.status != 200:
-                        self.error_handler.debug_error_notes(f"Failed to fetch klines: {response.status}, symbol: {symbol}, {await response.text()}")
-                        break
-
-                    klines = await response.json()
-                    if not klines:
-                        break
-
-                    all_data = klines + all_data  # prepend to preserve chronological order
-                    end_time = klines[0][0] - 1  # сдвигаем назад на 1мс до первой свечи
-                    remaining -= len(klines)
-
-                await asyncio.sleep(base_sleep)  # предотвратить бан
+            self.error_handler.debug_error_notes(f"limit={limit} in {inspect.currentframe().f_code.co_name}")
+            return KlinesArrays.empty_like()
 
-            if not all_data:
-                return pd.DataFrame(columns=['Time', 'Open', 'High', 'Low', 'Close', 'Volume'])
+        headers = {"X-MBX-APIKEY": api_key} if api_key else {}
+        if start_time is not None:
+            plan = [{"startTime": start_time, "limit": min(limit, MAX_LIMIT)}]
+        else:
+            plan = self.klines_pages_plan(interval, limit, int(time.time() * 1000), MAX_LIMIT)
 
-            df = pd.DataFrame(all_data).iloc[:, :6]
-            df.columns = ['Time', 'Open', 'High', 'Low', 'Close', 'Volume']
-            df['Time'] = pd.to_datetime(df['Time'], unit='ms')
-            df.set_index('Time', inplace=True)
-            df = df.astype(float).sort_index()
-            df['Volume'] = df['Volume'].abs()  # делаем объём положительным
+        try:
+            pages = await asyncio.gather(*[
+                self._fetch_klines_page(session, symbol, interval, page, headers) for page in plan
+            ])
+            pages = [page for page in reversed(pages) if page]   # от старых к новым
+            if not pages:
+                return KlinesArrays.empty_like()
 
-            return df.tail(limit)  # возвращаем ровно limit последних свечей
+            return parse_klines(pages).tail(limit)  # возвращаем ровно limit последних свечей
 
         except Exception as ex:
             self.error_handler.debug_error_notes(f"{ex} in {inspect.currentframe().f_code.co_name}")
-            return pd.DataFrame(columns=['Time', 'Open', 'High', 'Low', 'Close', 'Volume'])
+            return KlinesArrays.empty_like()
 
     async def get_klines_basic(
             self,
@@ -122,7 +234,8 @@ class BinancePublicApi:
             symbol: str,
             interval: str,
             limit: int,
-            api_key: str = None):
+            api_key: str = None,
+            priority: int = PRIORITY_KLINES):
         """
         Загружает данные свечей (klines) для заданного символа.
         """
@@ -136,28 +249,25 @@ class BinancePublicApi:
         if api_key:
             headers["X-MBX-APIKEY"] = api_key
 
+        columns = KlinesArrays.OHLCV + ['QuoteVolume']
         try:
-            async with session.get(self.klines_url, params=params, headers=headers) as response:
+            await self.limiter.acquire("klines", priority, weight=klines_weight(limit))
+            async with lane_session(self.network, session, LANE_BULK) as session, session.get(self.klines_url, params=params, headers=headers) as response:
+                self.limiter.update_from_response(response)
                 if response.status != 200:
                     self.error_handler.debug_error_notes(f"Failed to fetch klines: {response.status}, symbol: {symbol}, {await response.text()}")
-                    return pd.DataFrame(columns=['Time', 'Open', 'High', 'Low', 'Close', 'Volume', 'QuoteVolume'])
+                    return KlinesArrays.empty_like(columns)
 
                 klines = await response.json()
                 # print(klines)
                 if not klines:
-                    return pd.DataFrame(columns=['Time', 'Open', 'High', 'Low', 'Close', 'Volume', 'QuoteVolume'])
-
-            # Индексы: 0 - open time, 1 - open, 2 - high, 3 - low, 4 - close, 5 - volume, 7 - quote volume
-            data = pd.DataFrame(klines)[[0, 1, 2, 3, 4, 5, 7]]
-            data.columns = ['Time', 'Open', 'High', 'Low', 'Close', 'Volume', 'QuoteVolume']
+                    return KlinesArrays.empty_like(columns)
 
-            data['Time'] = pd.to_datetime(data['Time'], unit='ms')  # Преобразуем метки времени
-            data.set_index('Time', inplace=True)
-            return data.astype(float)
+            return parse_klines([klines], with_quote=True)
 
         except Exception as ex:
             self.error_handler.debug_error_notes(f"{ex} in {inspect.currentframe().f_code.co_name}")
-        return pd.DataFrame(columns=['Time', 'Open', 'High', 'Low', 'Close', 'Volume', 'QuoteVolume'])
+        return KlinesArrays.empty_like(columns)
 
 
 class BinancePrivateApi(HTTP_Validator):
@@ -177,11 +287,15 @@ class BinancePrivateApi(HTTP_Validator):
         self.set_margin_type_url = 'https://fapi.binance.com/fapi/v1/marginType'
         self.set_leverage_url = 'https://fapi.binance.com/fapi/v1/leverage'        
         self.positions2_url = 'https://fapi.binance.com/fapi/v2/account'       
+        self.listen_key_url = 'https://fapi.binance.com/fapi/v1/listenKey'
+        self.batch_orders_url = 'https://fapi.binance.com/fapi/v1/batchOrders'
       
 
         self.api_key, self.api_secret = api_key, api_secret 
         self.proxy_url = proxy_url
         self.user_label = user_label
+        self.limiter: RateLimiter = shared_limiter
+        self.network: Optional[NetworkManager] = None   # полосы запросов
 
     def get_signature(self, params: dict):
         params['timestamp'] = int(time.time() * 1000)
@@ -201,9 +315,11 @@ class BinancePrivateApi(HTTP_Validator):
             "X-MBX-APIKEY": self.api_key
         }
 
+        await self.limiter.acquire("balance", PRIORITY_POSITIONS, self.proxy_url)
         params = self.get_signature({})  # Подписываем запрос
 
-        async with session.get(self.balance_url, headers=headers, params=params, proxy=self.proxy_url) as response:
+        async with lane_session(self.network, session, LANE_NORMAL) as session, session.get(self.balance_url, headers=headers, params=params, proxy=self.proxy_url) as response:
+            self.limiter.update_from_response(response, self.proxy_url)
 
             if response.status != 200:
                 self.error_handler.debug_error_notes(f"[{self.user_label}][ERROR][get_avi_balance]: {response.status}, {await response.text()}")
@@ -217,15 +333,52 @@ class BinancePrivateApi(HTTP_Validator):
         return 0.0  # Если не нашли quote_asset  
         
     async def fetch_positions(self, session: aiohttp.ClientSession):
+        await self.limiter.acquire("account", PRIORITY_POSITIONS, self.proxy_url)
         params = self.get_signature({'recvWindow': 20000})
         headers = {
             'X-MBX-APIKEY': self.api_key
         }
-        async with session.get(self.positions2_url, headers=headers, params=params, proxy=self.proxy_url) as response:
+        async with lane_session(self.network, session, LANE_NORMAL) as session, session.get(self.positions2_url, headers=headers, params=params, proxy=self.proxy_url) as response:
+            self.limiter.update_from_response(response, self.proxy_url)
             if response.status != 200:
                 self.error_handler.debug_error_notes(f"[{self.user_label}]: Failed to fetch positions: {response.status}, {await response.text()}", True)
             return await response.json()      
 
+    async def create_listen_key(self, session: aiohttp.ClientSession) -> Optional[str]:
+        """Создаёт listenKey user-data stream (если ключ уже есть -- Binance вернёт его же)."""
+        headers = {
+            'X-MBX-APIKEY': self.api_key
+        }
+        await self.limiter.acquire("listenKey", PRIORITY_POSITIONS, self.proxy_url)
+        async with lane_session(self.network, session, LANE_NORMAL) as session, session.post(self.listen_key_url, headers=headers, proxy=self.proxy_url) as response:
+            self.limiter.update_from_response(response, self.proxy_url)
+            if response.status != 200:
+                self.error_handler.debug_error_notes(f"[{self.user_label}]: Failed to create listenKey: {response.status}, {await response.text()}", True)
+                return None
+            return (await response.json()).get("listenKey")
+
+    async def keepalive_listen_key(self, session: aiohttp.ClientSession) -> bool:
+        """Продлевает listenKey ещё на 60 минут."""
+        headers = {
+            'X-MBX-APIKEY': self.api_key
+        }
+        await self.limiter.acquire("listenKey", PRIORITY_POSITIONS, self.proxy_url)
+        async with lane_session(self.network, session, LANE_NORMAL) as session, session.put(self.listen_key_url, headers=headers, proxy=self.proxy_url) as response:
+            self.limiter.update_from_response(response, self.proxy_url)
+            if response.status != 200:
+                self.error_handler.debug_error_notes(f"[{self.user_label}]: Failed to keepalive listenKey: {response.status}, {await response.text()}")
+                return False
+            return True
+
+    async def close_listen_key(self, session: aiohttp.ClientSession) -> bool:
+        headers = {
+            'X-MBX-APIKEY': self.api_key
+        }
+        await self.limiter.acquire("listenKey", PRIORITY_POSITIONS, self.proxy_url)
+        async with lane_session(self.network, session, LANE_NORMAL) as session, session.delete(self.listen_key_url, headers=headers, proxy=self.proxy_url) as response:
+            self.limiter.update_from_response(response, self.proxy_url)
+            return response.status == 200
+
     async def get_realized_pnl(
         self,
         symbol: str,
@@ -236,7 +389,7 @@ class BinancePrivateApi(HTTP_Validator):
         """
         Считает реализованный PnL за период по символу (Binance Futures).
         Поддерживает фильтрацию по направлению позиции ("LONG"/"SHORT").
-        Делает до 7 реконнектов, пересоздавая сессию на каждой попытке.
+        Делает до 7 попыток через полосу bulk.
         """
         params = {
             "symbol": symbol,
@@ -253,13 +406,15 @@ class BinancePrivateApi(HTTP_Validator):
 
         for attempt in range(1, max_retries + 1):
             try:
-                async with aiohttp.ClientSession() as session:
+                await self.limiter.acquire("userTrades", PRIORITY_POSITIONS, self.proxy_url)
+                async with lane_session(self.network, None, LANE_BULK) as session:
                     async with session.get(
                         "https://fapi.binance.com/fapi/v1/userTrades",
                         params=self.get_signature(params),
                         headers=headers,
                         proxy=self.proxy_url,
                     ) as resp:
+                        self.limiter.update_from_response(resp, self.proxy_url)
                         if resp.status == 200:
                             rows = await resp.json()
                             break
@@ -311,8 +466,10 @@ class BinancePrivateApi(HTTP_Validator):
             headers = {
                 'X-MBX-APIKEY': self.api_key
             }
+            await self.limiter.acquire("positionSide/dual", PRIORITY_ORDERS, self.proxy_url)
             params = self.get_signature(params)
-            async with session.post(self.change_trade_mode, headers=headers, params=params, proxy=self.proxy_url) as response:
+            async with lane_session(self.network, session, LANE_CRITICAL) as session, session.post(self.change_trade_mode, headers=headers, params=params, proxy=self.proxy_url) as response:
+                self.limiter.update_from_response(response, self.proxy_url)
                 try:
                     resp_j = await response.json()
                 except:
@@ -340,8 +497,10 @@ class BinancePrivateApi(HTTP_Validator):
             headers = {
                 'X-MBX-APIKEY': self.api_key
             }
+            await self.limiter.acquire("marginType", PRIORITY_ORDERS, self.proxy_url)
             params = self.get_signature(params)
-            async with session.post(self.set_margin_type_url, headers=headers, params=params, proxy=self.proxy_url) as response:
+            async with lane_session(self.network, session, LANE_CRITICAL) as session, session.post(self.set_margin_type_url, headers=headers, params=params, proxy=self.proxy_url) as response:
+                self.limiter.update_from_response(response, self.proxy_url)
                 await self.requests_logger(response, self.user_label, strategy_name, "set_margin_type", symbol)
         except Exception as ex:
             self.error_handler.debug_error_notes(f"{ex} in {inspect.currentframe().f_code.co_name} at line {inspect.currentframe().f_lineno}")
@@ -362,8 +521,10 @@ class BinancePrivateApi(HTTP_Validator):
             headers = {
                 'X-MBX-APIKEY': self.api_key
             }
+            await self.limiter.acquire("leverage", PRIORITY_ORDERS, self.proxy_url)
             params = self.get_signature(params)
-            async with session.post(self.set_leverage_url, headers=headers, params=params, proxy=self.proxy_url) as response:
+            async with lane_session(self.network, session, LANE_CRITICAL) as session, session.post(self.set_leverage_url, headers=headers, params=params, proxy=self.proxy_url) as response:
+                self.limiter.update_from_response(response, self.proxy_url)
                 await self.requests_logger(response, self.user_label, strategy_name, "set_leverage", symbol)
             
         except Exception as ex:
@@ -399,8 +560,10 @@ class BinancePrivateApi(HTTP_Validator):
                 'X-MBX-APIKEY': self.api_key
             }           
 
+            await self.limiter.acquire("order", PRIORITY_ORDERS, self.proxy_url, self.api_key, orders=1)
             params = self.get_signature(params)
-            async with session.post(self.create_order_url, headers=headers, params=params, proxy=self.proxy_url) as response:
+            async with lane_session(self.network, session, LANE_CRITICAL) as session, session.post(self.create_order_url, headers=headers, params=params, proxy=self.proxy_url) as response:
+                self.limiter.update_from_response(response, self.proxy_url, self.api_key)
                 return await self.requests_logger(response, self.user_label, strategy_name, "place_order", symbol, position_side)
             
         except Exception as ex:
@@ -408,6 +571,85 @@ class BinancePrivateApi(HTTP_Validator):
 
         return {}, self.user_label, strategy_name, symbol, position_side      
 
+    @staticmethod
+    def risk_order_params(
+            symbol: str,
+            qty: float,
+            side: str,
+            position_side: str,
+            target_price: float,
+            suffix: str,
+            order_type: str
+        ) -> dict:
+        """Параметры SL/TP ордера (общие для одиночного и пакетного размещения)."""
+        if suffix == "sl":
+            return {
+                "symbol": symbol,
+                "side": side,
+                "type": "STOP_MARKET",
+                "quantity": abs(qty),
+                "positionSide": position_side,
+                "stopPrice": target_price,
+                "closePosition": "true",
+                "recvWindow": 20000,
+                "newOrderRespType": "RESULT"
+            }
+
+        elif suffix == "tp": 
+            if order_type.upper() == "MARKET":       
+                return {
+                    "symbol": symbol,
+                    "side": side,
+                    "type": "TAKE_PROFIT_MARKET",
+                    "quantity": abs(qty),
+                    "positionSide": position_side,
+                    "stopPrice": target_price,
+                    "closePosition": "true",
+                    "recvWindow": 20000,
+                    "newOrderRespType": "RESULT"
+                }
+
+            elif order_type.upper() == "LIMIT":                
+                return {
+                    "symbol": symbol,
+                    "side": side,
+                    "type": "LIMIT",
+                    "quantity": abs(qty),
+                    "positionSide": position_side,
+                    "price": str(target_price),  # лимитная цена
+                    "timeInForce": "GTC",       # удерживать пока не исполнится
+                    "recvWindow": 20000,
+                    "newOrderRespType": "RESULT"
+                }
+
+            raise ValueError(f"Неизвестный order_type: {order_type}")
+        raise ValueError(f"Неизвестный suffix: {suffix}")
+
+    @classmethod
+    def batch_risk_order_params(
+            cls,
+            symbol: str,
+            qty: float,
+            side: str,
+            position_side: str,
+            target_price: float,
+            suffix: str,
+            order_type: str
+        ) -> Optional[dict]:
+        """
+        Параметры SL/TP для /batchOrders или None, если ордер в пакет не годится.
+        closePosition пакет не принимает, а фиксированный quantity для SL и TP-market
+        занизил бы их при частичном исполнении -- такие ордера идут только поштучно.
+        В пакет попадают ордера с quantity (лимитный TP). reduceOnly -- только в one-way
+        режиме (в hedge mode Binance его отклоняет).
+        """
+        params = cls.risk_order_params(symbol, qty, side, position_side, target_price, suffix, order_type)
+        if params.get("closePosition") == "true":
+            return None
+        if not position_side or position_side.upper() == "BOTH":
+            params["reduceOnly"] = "true"
+        return params
+
     async def place_risk_order(
             self,
             session: aiohttp.ClientSession,
@@ -428,58 +670,19 @@ class BinancePrivateApi(HTTP_Validator):
             'tp'  — тейк-профит
         """
         try:
-            if suffix == "sl":
-                params = {
-                    "symbol": symbol,
-                    "side": side,
-                    "type": "STOP_MARKET",
-                    "quantity": abs(qty),
-                    "positionSide": position_side,
-                    "stopPrice": target_price,
-                    "closePosition": "true",
-                    "recvWindow": 20000,
-                    "newOrderRespType": "RESULT"
-                }
-
-            elif suffix == "tp": 
-                if order_type.upper() == "MARKET":       
-                    params = {
-                        "symbol": symbol,
-                        "side": side,
-                        "type": "TAKE_PROFIT_MARKET",
-                        "quantity": abs(qty),
-                        "positionSide": position_side,
-                        "stopPrice": target_price,
-                        "closePosition": "true",
-                        "recvWindow": 20000,
-                        "newOrderRespType": "RESULT"
-                    }
-
-                elif order_type.upper() == "LIMIT":                
-                    params = {
-                        "symbol": symbol,
-                        "side": side,
-                        "type": "LIMIT",
-                        "quantity": abs(qty),
-                        "positionSide": position_side,
-                        "price": str(target_price),  # лимитная цена
-                        "timeInForce": "GTC",       # удерживать пока не исполнится
-                        "recvWindow": 20000,
-                        "newOrderRespType": "RESULT"
-                    }
-
-                else:
-                    raise ValueError(f"Неизвестный suffix: {suffix}")
+            params = self.risk_order_params(symbol, qty, side, position_side, target_price, suffix, order_type)
 
             headers = {"X-MBX-APIKEY": self.api_key}
+            await self.limiter.acquire("order", PRIORITY_ORDERS, self.proxy_url, self.api_key, orders=1)
             params = self.get_signature(params)
 
-            async with session.post(
+            async with lane_session(self.network, session, LANE_CRITICAL) as session, session.post(
                 self.create_order_url,
                 headers=headers,
                 params=params,
                 proxy=self.proxy_url
             ) as response:
+                self.limiter.update_from_response(response, self.proxy_url, self.api_key)
                 return await self.requests_logger(
                     response,
                     self.user_label,
@@ -497,6 +700,75 @@ class BinancePrivateApi(HTTP_Validator):
 
         return {}, self.user_label, strategy_name, symbol, position_side    
         
+    async def _batch_request(
+            self,
+            session: aiohttp.ClientSession,
+            method: str,
+            params: dict,
+            orders: int,
+            strategy_name: str,
+            target: str,
+            symbol: str
+        ) -> List[dict]:
+        """Запрос к /batchOrders. Ответ -- список (ордер или {code, msg}) в порядке запроса."""
+        headers = {"X-MBX-APIKEY": self.api_key}
+        await self.limiter.acquire("batchOrders", PRIORITY_ORDERS, self.proxy_url, self.api_key, orders=orders)
+        params = self.get_signature(params)
+        async with lane_session(self.network, session, LANE_CRITICAL) as session, session.request(
+            method,
+            self.batch_orders_url,
+            headers=headers,
+            params=params,
+            proxy=self.proxy_url
+        ) as response:
+            self.limiter.update_from_response(response, self.proxy_url, self.api_key)
+            data, status = await self._status_extracter(response)
+            is_success = isinstance(data, list) and status == 200
+            await self._log_sorter(is_success, data, status, self.user_label, strategy_name, target, symbol)
+            return data if is_success else []
+
+    async def place_batch_orders(
+            self,
+            session: aiohttp.ClientSession,
+            strategy_name: str,
+            symbol: str,
+            orders: List[dict]
+        ) -> List[dict]:
+        """
+        До 5 ордеров одним запросом (POST /fapi/v1/batchOrders).
+        orders -- параметры как для одиночного ордера (см. risk_order_params).
+        """
+        batch = [
+            {k: str(v) for k, v in order.items() if k != "recvWindow" and v is not None}
+            for order in orders[:5]
+        ]
+        try:
+            return await self._batch_request(
+                session, "POST", {"batchOrders": json.dumps(batch, separators=(",", ":")), "recvWindow": 20000},
+                len(batch), strategy_name, "place_batch_orders", symbol
+            )
+        except Exception as ex:
+            self.error_handler.debug_error_notes(f"{ex} in {inspect.currentframe().f_code.co_name} at line {inspect.currentframe().f_lineno}")
+        return []
+
+    async def cancel_batch_orders(
+            self,
+            session: aiohttp.ClientSession,
+            strategy_name: str,
+            symbol: str,
+            order_ids: List[int]
+        ) -> List[dict]:
+        """До 10 отмен одним запросом (DELETE /fapi/v1/batchOrders)."""
+        try:
+            return await self._batch_request(
+                session, "DELETE",
+                {"symbol": symbol, "orderIdList": json.dumps([int(x) for x in order_ids[:10]]), "recvWindow": 20000},
+                0, strategy_name, "cancel_batch_orders", symbol
+            )
+        except Exception as ex:
+            self.error_handler.debug_error_notes(f"{ex} in {inspect.currentframe().f_code.co_name} at line {inspect.currentframe().f_lineno}")
+        return []
+
     # async def place_risk_order(
     #         self,
     #         session: aiohttp.ClientSession,
@@ -564,8 +836,10 @@ class BinancePrivateApi(HTTP_Validator):
                 'X-MBX-APIKEY': self.api_key
             }
 
+            await self.limiter.acquire("order", PRIORITY_ORDERS, self.proxy_url, self.api_key)
             params = self.get_signature(params)
-            async with session.delete(self.cancel_order_url, headers=headers, params=params, proxy=self.proxy_url) as response:
+            async with lane_session(self.network, session, LANE_CRITICAL) as session, session.delete(self.cancel_order_url, headers=headers, params=params, proxy=self.proxy_url) as response:
+                self.limiter.update_from_response(response, self.proxy_url, self.api_key)
                 return await self.requests_logger(response, self.user_label, strategy_name, f"cancel_{suffix.lower()}_order", symbol, order_id)
 
         except Exception as ex:
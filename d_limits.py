@@ -0,0 +1,202 @@
+import asyncio
+import time
+from typing import Dict, List, Mapping, Optional, Tuple
+
+# Приоритеты очереди запросов (меньше -- раньше)
+PRIORITY_ORDERS = 0
+PRIORITY_POSITIONS = 1
+PRIORITY_KLINES = 2
+PRIORITY_FILTER = 3
+
+# Вес эндпоинтов Binance Futures (REQUEST_WEIGHT, считается на IP)
+ENDPOINT_WEIGHTS = {
+    "exchangeInfo": 1,
+    "ticker/price": 1,
+    "account": 5,
+    "balance": 5,
+    "userTrades": 5,
+    "order": 1,
+    "batchOrders": 5,
+    "leverage": 1,
+    "marginType": 1,
+    "positionSide/dual": 1,
+    "listenKey": 1,
+}
+
+
+def klines_weight(limit: int) -> int:
+    """Вес /fapi/v1/klines зависит от limit."""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+class TokenBucket:
+    """
+    Токен-бакет на окно window секунд: limit токенов, равномерное пополнение.
+    Держим запас (reserve_ratio) от биржевого лимита и подтягиваем остаток по заголовкам Binance.
+    """
+
+    def __init__(self, limit: int, window: float, reserve_ratio: float = 0.9):
+        self.capacity: float = limit * reserve_ratio
+        self.window: float = window
+        self.rate: float = self.capacity / window
+        self.tokens: float = self.capacity
+        self.updated: float = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float) -> float:
+        """Сколько секунд ждать, пока наберётся amount токенов (0 -- можно сейчас)."""
+        self._refill(time.monotonic())
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        self._refill(time.monotonic())
+        self.tokens -= amount
+
+    def sync_used(self, used: float) -> None:
+        """Биржа сообщила, сколько уже израсходовано в текущем окне."""
+        self._refill(time.monotonic())
+        self.tokens = min(self.tokens, self.capacity - used)
+
+
+class RateLimiter:
+    """
+    Единый учёт лимитов REST Binance Futures для всех клиентов d_bapi.
+    Бюджеты: вес запросов -- на IP (прокси), счётчики ордеров -- на аккаунт (api key).
+    Остаток подтягивается по заголовкам ответов, 418/429 блокируют IP на Retry-After.
+    Ожидающие запросы обслуживаются по приоритету (ордера > позиции > свечи > фильтр).
+    """
+    header_map = {
+        "X-MBX-USED-WEIGHT-1M": ("ip", "weight_1m"),
+        "X-MBX-ORDER-COUNT-10S": ("account", "order_10s"),
+        "X-MBX-ORDER-COUNT-1M": ("account", "order_1m"),
+    }
+
+    def __init__(self, weight_limit: int = 2400, orders_10s_limit: int = 300, orders_1m_limit: int = 1200):
+        self.weight_limit = weight_limit
+        self.orders_10s_limit = orders_10s_limit
+        self.orders_1m_limit = orders_1m_limit
+
+        self.ip_buckets: Dict[str, Dict[str, TokenBucket]] = {}
+        self.account_buckets: Dict[str, Dict[str, TokenBucket]] = {}
+        self.blocked_until: Dict[str, float] = {}
+
+        self.queue: List[Tuple[int, int, frozenset]] = []   # (priority, seq, ключи бакетов)
+        self.seq = 0
+        self.cond: Optional[asyncio.Condition] = None
+
+    @staticmethod
+    def ip_scope(proxy_url: Optional[str]) -> str:
+        return proxy_url or "direct"
+
+    def _ip(self, ip_key: str) -> Dict[str, TokenBucket]:
+        buckets = self.ip_buckets.get(ip_key)
+        if buckets is None:
+            buckets = self.ip_buckets[ip_key] = {"weight_1m": TokenBucket(self.weight_limit, 60)}
+        return buckets
+
+    def _account(self, account_key: str) -> Dict[str, TokenBucket]:
+        buckets = self.account_buckets.get(account_key)
+        if buckets is None:
+            buckets = self.account_buckets[account_key] = {
+                "order_10s": TokenBucket(self.orders_10s_limit, 10),
+                "order_1m": TokenBucket(self.orders_1m_limit, 60),
+            }
+        return buckets
+
+    def _delay(self, ip_key: str, need: List[Tuple[TokenBucket, float]]) -> float:
+        delay = max((bucket.delay(amount) for bucket, amount in need), default=0.0)
+        return max(delay, self.blocked_until.get(ip_key, 0.0) - time.monotonic())
+
+    async def acquire(
+            self,
+            endpoint: str,
+            priority: int,
+            proxy_url: Optional[str] = None,
+            account_key: Optional[str] = None,
+            weight: Optional[int] = None,
+            orders: int = 0
+        ) -> None:
+        """Ждёт бюджет под запрос. Более приоритетные ожидающие с общими бюджетами проходят первыми."""
+        if self.cond is None:
+            self.cond = asyncio.Condition()
+
+        ip_key = self.ip_scope(proxy_url)
+        weight = ENDPOINT_WEIGHTS.get(endpoint, 1) if weight is None else weight
+        need = [(self._ip(ip_key)["weight_1m"], weight)]
+        scopes = {f"ip:{ip_key}"}
+        if account_key and orders:
+            account = self._account(account_key)
+            need += [(account["order_10s"], orders), (account["order_1m"], orders)]
+            scopes.add(f"account:{account_key}")
+
+        self.seq += 1
+        entry = (priority, self.seq, frozenset(scopes))
+
+        async with self.cond:
+            self.queue.append(entry)
+            try:
+                while True:
+                    # первые среди тех, с кем делим бюджет?
+                    is_first = all(
+                        other[:2] >= entry[:2] for other in self.queue if other[2] & entry[2]
+                    )
+                    timeout = None
+                    if is_first:
+                        delay = self._delay(ip_key, need)
+                        if delay <= 0:
+                            for bucket, amount in need:
+                                bucket.take(amount)
+                            return
+                        timeout = delay
+                    try:
+                        await asyncio.wait_for(self.cond.wait(), timeout=timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self.queue.remove(entry)
+                self.cond.notify_all()
+
+    def update_from_response(
+            self,
+            response,
+            proxy_url: Optional[str] = None,
+            account_key: Optional[str] = None
+        ) -> None:
+        """Синхронизирует бюджеты по заголовкам ответа и обрабатывает 418/429."""
+        if response is None:
+            return
+        ip_key = self.ip_scope(proxy_url)
+        headers: Mapping[str, str] = response.headers or {}
+
+        for header, (scope, name) in self.header_map.items():
+            used = headers.get(header)
+            if used is None:
+                continue
+            if scope == "account" and not account_key:
+                continue
+            buckets = self._ip(ip_key) if scope == "ip" else self._account(account_key)
+            try:
+                buckets[name].sync_used(float(used))
+            except ValueError:
+                continue
+
+        if response.status in (418, 429):
+            try:
+                retry_after = float(headers.get("Retry-After", 60))
+            except ValueError:
+                retry_after = 60.0
+            self.blocked_until[ip_key] = max(self.blocked_until.get(ip_key, 0.0), time.monotonic() + retry_after)
+
+
+shared_limiter = RateLimiter()
@@ -1,10 +1,11 @@
 # from a_settings import TokensTemplate
 from b_context import BotContext
 from c_log import ErrorHandler, log_time
-from d_bapi import BinancePublicApi
+from d_bapi import BinancePublicApi, KlinesArrays
+from d_limits import PRIORITY_FILTER
 import asyncio 
 import aiohttp
-from random import uniform
+import numpy as np
 import pandas as pd
 from pprint import pprint
 
@@ -33,14 +34,19 @@ class CoinFilter:
         return tfr, period, min_rule, max_rule
 
     @staticmethod
-    def mean_calc(df, column_name):
-        return df[column_name].dropna().mean()
+    def mean_calc(klines: KlinesArrays, column_name):
+        values = klines.column(column_name)
+        values = values[~np.isnan(values)]
+        return float(values.mean()) if len(values) else None
         
     @staticmethod
-    def delta_fn(df, column_name):
-        df = df[(df['High'] != df['Low']) & (df['Low'] != 0)].copy()
-        df[column_name] = ((df['High'] - df['Low']) / df['Low']) * 100
-        return df[column_name].mean()
+    def delta_fn(klines: KlinesArrays, column_name):
+        # column_name -- только метка метрики, считаем по High/Low
+        high, low = klines.column('High'), klines.column('Low')
+        mask = (high != low) & (low != 0)
+        if not mask.any():
+            return None
+        return float(((high[mask] - low[mask]) / low[mask] * 100).mean())
 
     async def metric_filter(
         self,
@@ -53,18 +59,19 @@ class CoinFilter:
     ):
         try:
             tfr, period, min_rule, max_rule = self.get_settings(sourse_setting)
-            df = await self.binance_public.get_klines_basic(
+            klines = await self.binance_public.get_klines_basic(
                 session=session,
                 symbol=symbol,
                 interval=tfr,
-                limit=period
+                limit=period,
+                priority=PRIORITY_FILTER
             )
 
-            if df is None or df.empty:
+            if klines is None or klines.empty:
                 return None
 
             # Подсчёт метрики
-            value = metric_calc_fn(df, column_name)
+            value = metric_calc_fn(klines, column_name)
             if value is None or pd.isna(value):
                 return None
             # pprint(f"[{user}][{symbol}][{tfr}][{column_name}]: {value:.4f}")
@@ -80,8 +87,6 @@ class CoinFilter:
 
     async def filter_symbol(self, session, user, symbol, filter_set):
         async with semaphore:
-            await asyncio.sleep(uniform(0.25, 0.46))
-
             async def apply_metric(filter_config, column_name, metric_fn):
                 if not filter_config["enable"]:
                     return False, None
@@ -12,13 +12,14 @@ from c_log import ErrorHandler, log_time
 from c_utils import PositionUtils, TimingUtils
 from c_validators import TimeframeValidator, OrderValidator
 from d_bapi import BinancePublicApi
-from MANAGERS.online import WebSocketManager, NetworkManager
-from MANAGERS.offline import KlinesCacheManager, WriteLogManager
+from MANAGERS.online import WebSocketManager, NetworkManager, UserDataStream
+from MANAGERS.offline import KlinesCacheManager, WriteLogManager, ExchangeInfoManager
 from c_validators import validate_dataframe
 from BUSINESS.position_control import Sync
 from BUSINESS.order_patterns import RiskSet, HandleOrders
 from BUSINESS.risk_orders_control import RiskOrdersControl
 from BUSINESS.signals import SIGNALS, extract_signal_func_name
+from BUSINESS.kernels import warmup_kernels
 from d_bapi import BinancePrivateApi
 from e_filter import CoinFilter
 from TG.tg_notifier import TelegramNotifier
@@ -26,8 +27,6 @@ from TG.tg_notifier import TelegramNotifier
 import traceback
 
 
-SESSION_LIMIT = 15
-
 def generate_bible_quote():
     random_bible_list = [
         "<<Благодать Господа нашего Иисуса Христа, и любовь Бога Отца, и общение Святаго Духа со всеми вами. Аминь.>>\n___(2-е Коринфянам 13:13)___",
@@ -145,7 +144,16 @@ class Core:
         self.public_session: aiohttp.ClientSession = self.publuc_connector.session
 
         self.binance_public: BinancePublicApi = self.container.get("binance_public")
-        self.context.symbol_info = await self.binance_public.get_exchange_info(self.public_session)
+        self.binance_public.network = self.publuc_connector
+        # индекс exchangeInfo: с диска, если свежий, иначе запрос; дальше обновляется в фоне
+        self.exchange_info_manager = ExchangeInfoManager(
+            context=self.context,
+            error_handler=self.error_handler,
+            get_exchange_info=self.binance_public.get_exchange_info,
+            ttl=EXCHANGE_INFO_TTL
+        )
+        if not await self.exchange_info_manager.initialize(self.public_session):
+            self.error_handler.debug_error_notes('[ERROR][public]: не удалось получить exchangeInfo')
         position_vars_setup: PositionVarsSetup = self.container.get("position_vars_setup")
         position_vars_setup.setup_pos_vars()
         # //
@@ -153,6 +161,7 @@ class Core:
         await asyncio.gather(*[self._init_all_users_sessions(user_name) for user_name in self.all_users])
         # //
         self.websocket_manager: WebSocketManager = self.container.get("websocket_manager")
+        self.user_data_stream: UserDataStream = self.container.get("user_data_stream")
         self.time_frame_validator: TimeframeValidator = self.container.get("time_frame_validator")
 
         setup_dependencies_third(self.container, {
@@ -163,7 +172,10 @@ class Core:
             "pos_utils": self.pos_utils
         })
         self.klines_cache_manager: KlinesCacheManager = self.container.get("klines_cache_manager")
+        self.websocket_manager.on_closed_bar = self.klines_cache_manager.push_closed_bar
         self.signals: SIGNALS = self.container.get("signals")        
+        # компиляция numba-ядер индикаторов (с cache=True -- загрузка с диска)
+        await asyncio.to_thread(warmup_kernels)
         self.cron_cycle: TimingUtils = self.container.get("cron_cycle")
         self.cron_filter: TimingUtils = self.container.get("cron_filter")     
         self.order_validator: OrderValidator = self.container.get("order_validator")
@@ -173,7 +185,8 @@ class Core:
         self.risk_order_patterns = RiskSet(
             context=self.context,
             error_handler=self.error_handler,
-            validate=self.order_validator
+            validate=self.order_validator,
+            pre_trade=self.container.get("pre_trade_validator")
         )
 
         self.write_log: WriteLogManager = self.container.get("write_log_manager")
@@ -195,7 +208,8 @@ class Core:
             token=TG_BOT_TOKEN,
             chat_ids=[TG_BOT_ID,],
             context=self.context,
-            info_handler=self.error_handler 
+            info_handler=self.error_handler,
+            connector=self.publuc_connector
         )
 
         self.sync = Sync(
@@ -207,8 +221,12 @@ class Core:
             cancel_all_risk_orders=self.risk_order_patterns.cancel_all_risk_orders,
             preform_message=self.notifier.preform_message,
             use_cache=USE_CACHE,
-            positions_update_frequency=POS_UPDATE_FREQUENCY
+            positions_update_frequency=POS_UPDATE_FREQUENCY,
+            reconcile_interval=POS_RECONCILE_INTERVAL
         )
+        self.sync.is_user_stream_alive = self.user_data_stream.is_alive
+        self.user_data_stream.on_event = self.sync.apply_user_data_event
+        self.user_data_stream.on_reconnect = self.sync.request_reconcile
 
         self.filter = CoinFilter(
             context=self.context, 
@@ -237,47 +255,13 @@ class Core:
             proxy_url=proxy_url,
             user_label=user_name,
         )
+        binance_client.network = connector
 
         self.context.user_contexts[user_name] = {
             "connector": connector,
             "binance_client": binance_client,
         }
 
-    async def refresh_connector(self, user_name: str) -> bool:
-        """
-        Пересоздаёт NetworkManager и обновляет connector в user_contexts,
-        только если это действительно нужно (при реальном сбое сессии).
-        Возвращает True, если сессия в порядке.
-        """
-        connector: NetworkManager = self.context.user_contexts[user_name]["connector"]
-        is_valid, was_reconnected = await connector.validate_session()
-
-        if is_valid and not was_reconnected:
-            # Всё норм, сессия рабочая, ничего не меняем
-            return True
-
-        if not is_valid:
-            self.error_handler.debug_error_notes(f"[ERROR][{user_name}]: не удалось восстановить старый connector")
-
-        # Пересоздаём только если реальный фейл или reconnected (для свежей сессии)
-        user_details: dict = self.context.total_settings[user_name]
-        proxy_url = user_details.get("proxy_url")
-
-        new_connector = NetworkManager(
-            error_handler=self.error_handler,
-            proxy_url=proxy_url,
-            user_label=user_name
-        )
-        await new_connector.initialize_session()
-
-        new_valid, _ = await new_connector.validate_session()
-        if not new_valid:
-            self.error_handler.debug_error_notes(f"[ERROR][{user_name}]: не удалось инициализировать новый connector")
-            return False
-
-        self.context.user_contexts[user_name]["connector"] = new_connector
-        return True
-
     async def _quit_all_users_sessions(self, user_name: str) -> None:
         connector: NetworkManager = self.context.user_contexts[user_name]["connector"]
         await connector.shutdown_session()
@@ -292,8 +276,6 @@ class Core:
             self.error_handler.debug_error_notes(f'[ERROR][public]: проблемы с инициализацией сессии')
             raise RuntimeError(f"Failed to initialize session for 'public'")
 
-        check_sessions_counter = 0        
-        update_positions_counter = 0
         self.sessions_ok = True
 
         if not self.context.fetch_symbols:
@@ -326,41 +308,28 @@ class Core:
         # pprint(self.context.position_vars)
 
         asyncio.create_task(self.sync.positions_flow_manager())
+        asyncio.create_task(self.exchange_info_manager.refresh_loop(self.public_session))
+        await self.user_data_stream.start(self.all_users)
 
         while not self.context.stop_bot and not all(self.context.first_update_done.get(user_name, False) for user_name in self.all_users):
             await asyncio.sleep(0.25)
 
         print("Начало основного цикла...")
 
-        # ---- Обновляем инструменты каждые 300 секунд ---
-        instrume_update_interval = 300.0
         # --- пишем логи каждые 5 секунд ---
         write_logs_interval = 5.0
 
-        last_instrume_time = time.monotonic()
         last_write_logs_time = time.monotonic()   
         # print(self.context.fetch_symbols)   
         # print(self.context.position_vars)
 
         while not self.context.stop_bot:
             try:
-                check_sessions_counter += 1
-                update_positions_counter += 1
                 users_tasks = []
+                # события, накопленные с прошлого прохода (тики цен, обновления позиций, свечи)
+                events = self.context.drain_events()
 
-                if check_sessions_counter >= SESSION_LIMIT:
-                    check_sessions_counter = 0
-
-                    # проверяем публичку
-                    if not await self.publuc_connector.validate_session():
-                        self.error_handler.debug_error_notes(f'[ERROR][public]: проблемы с обновлением сессии')
-
-                    # рефрешим приватки
-                    result = await asyncio.gather(*[self.refresh_connector(user_name) for user_name in self.all_users])
-                    if not all(result):
-                        self.error_handler.debug_info_notes("❌ Не все сессии восстановлены. Ожидаем перед повтором...")
-                        await asyncio.sleep(60)
-                        continue
+                # здоровье сессий отслеживается пассивно в NetworkManager (пересоздание в фоне)
 
                 if self.cron_filter.time_scheduler() or self.context.first_iter:
                     # print("self.cron_filter.time_scheduler()")
@@ -370,22 +339,50 @@ class Core:
 
                 # //signal block:
                 interval_completed = self.cron_cycle.time_scheduler()
-                long_count, short_count, active_symbols = self.pos_utils.count_active_symbols(
-                    self.context.position_vars
-                )
+                long_count, short_count, active_symbols = self.pos_utils.count_active_symbols()
+                self.context.price_watch_symbols = active_symbols
 
                 should_get_klines = self.klines_cache_manager.get_klines_scheduler(active_symbols, interval_completed)
 
                 if should_get_klines or self.context.first_iter:   
                     # print("should_get_klines")
                     if self.context.ukik_suffics_data.get("klines_lim") > 0:       
-                        await asyncio.sleep(WAIT_CLOSE_CANDLE)
-                        await self.klines_cache_manager.total_klines_handler(self.public_session)
+                        # закрытые свечи собираются из WS; REST -- только для ТФ и символов, где они не пришли
+                        missing_frames = await self.klines_cache_manager.wait_ws_bars(WAIT_CLOSE_CANDLE)
+                        if missing_frames:
+                            await self.klines_cache_manager.total_klines_handler(self.public_session, missing_frames)
+                        # индикаторы по всем символам одним проходом; get_signal читает готовое
+                        self.signals.evaluate_panel(self.context.fetch_symbols)
                         # print(self.context.klines_data_cache)
                 
                 if not (should_get_klines or active_symbols) and not self.pos_utils.has_any_failed_position():
                     continue
 
+                # Полный проход -- на новой свече, первой итерации и по таймауту простоя.
+                # Иначе переоцениваем только затронутые событиями (user_name, symbol).
+                targets = None
+                full_users = set()
+                if not (should_get_klines or self.context.first_iter or not events):
+                    targets = {
+                        (user, symbol) for kind, user, symbol in events
+                        if not (kind == "price" and symbol not in active_symbols)
+                    }
+                    if not targets:
+                        continue
+                    # изменение позиции может освободить лимит long/short_positions_limit --
+                    # у такого пользователя перепроверяем открытие по всем символам
+                    full_users = {user for kind, user, _ in events if kind == "position" and user}
+
+                # один векторный проход по всем открытым позициям; поштучно мониторим только сработавшие.
+                # Если проход упал -- None: мониторим все позиции, как раньше
+                try:
+                    risk_candidates = self.risk_order_control.risk_candidates()
+                except Exception as e:
+                    risk_candidates = None
+                    self.error_handler.debug_error_notes(
+                        f"[risk_candidates] ошибка векторного прохода, мониторим все позиции: {e}\n{traceback.format_exc()}"
+                    )
+
                 for user_name in self.all_users:
                     core_settings: Dict = self.context.total_settings[user_name]["core"]
                     connector: NetworkManager = self.context.user_contexts[user_name]["connector"]
@@ -398,6 +395,11 @@ class Core:
 
                         for symbol, symbol_pos_data in strategy_data.items():
                             # print(symbol)
+                            if (
+                                targets is not None and user_name not in full_users
+                                and (None, symbol) not in targets and (user_name, symbol) not in targets
+                            ):
+                                continue
                             for position_side in ("LONG", "SHORT"):
 
                                 if extract_signal_func_name(strategy_name) == "cron":                                    
@@ -450,6 +452,8 @@ class Core:
 
                                 if symbol not in active_symbols:
                                     continue
+                                if risk_candidates is not None and (user_name, strategy_name, symbol, position_side) not in risk_candidates:
+                                    continue
 
                                 users_tasks.append(self.risk_order_control.risk_symbol_monitoring(                                  
                                     user_name=user_name,
@@ -483,25 +487,25 @@ class Core:
                     self.error_handler.debug_error_notes(err_msg, is_print=True)      
 
                 now = time.monotonic()
-                # if now - last_instrume_time >= instrume_update_interval:
-                #     try:
-                #         self.context.symbol_info = await self.binance_public.get_exchange_info(self.public_session)
-                #         if not self.context.symbol_info:
-                #             self.error_handler.debug_error_notes(f"[ERROR] Failed to fetch instruments: {e}", is_print=True)
-
-                #     except Exception as e:
-                #         self.error_handler.debug_error_notes(f"[ERROR] Failed to fetch instruments: {e}", is_print=True)
-                #     last_instrume_time = now
-
                 if now - last_write_logs_time >= write_logs_interval:
                     try:
                         await self.write_log.write_logs()
                     except Exception as e:
                         self.error_handler.debug_error_notes(f"Ошибка при записи логов: {e}")
+                    await self.klines_cache_manager.save_to_disk()
                     last_write_logs_time = now
 
                 self.context.first_iter = False
-                await asyncio.sleep(MAIN_CYCLE_FREQUENCY)
+                # ждём событий, но не дольше границы ближайшей свечи / окна фильтра
+                idle_timeout = max(0.01, min(
+                    MAIN_IDLE_TIMEOUT,
+                    self.cron_cycle.seconds_to_next(),
+                    self.cron_filter.seconds_to_next()
+                ))
+                try:
+                    await asyncio.wait_for(self.context.events_signal.wait(), timeout=idle_timeout)
+                except asyncio.TimeoutError:
+                    pass
                 # print("Tik")
 
 
@@ -526,6 +530,13 @@ async def main():
                 print(f"[SYNC][ERROR] write_cache: {e}")
 
         instance.context.stop_bot = True
+        if hasattr(instance, "klines_cache_manager"):
+            await instance.klines_cache_manager.save_to_disk()
+        if hasattr(instance, "risk_order_patterns") and instance.risk_order_patterns.pre_trade:
+            pre_trade = instance.risk_order_patterns.pre_trade
+            print(f"Pre-trade: отклонено локально {pre_trade.saved_round_trips}, скорректировано {pre_trade.adjusted}")
+        if hasattr(instance, "user_data_stream"):
+            await instance.user_data_stream.stop()
         await asyncio.gather(*[instance._quit_all_users_sessions(user_name) for user_name in instance.all_users])
         await instance.publuc_connector.shutdown_session()  # ← добавь это
         print("Сессии закрываются...")
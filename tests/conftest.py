@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# модули проекта импортируются от корня репозитория (как при запуске main.py)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,78 @@
+"""
+Пакетные SL/TP (d_bapi): в /batchOrders идут только ордера с фиксированным quantity,
+SL и TP-market остаются на closePosition и отправляются поштучно.
+"""
+import asyncio
+import json
+
+from d_bapi import BinancePrivateApi
+
+
+class SilentErrorHandler:
+    def wrap_foreign_methods(self, obj):
+        pass
+
+    def debug_error_notes(self, *args, **kwargs):
+        pass
+
+    def debug_info_notes(self, *args, **kwargs):
+        pass
+
+
+def test_close_position_orders_are_not_batched():
+    sl = BinancePrivateApi.risk_order_params("BTCUSDT", 0.5, "SELL", "LONG", 29000.0, "sl", "MARKET")
+    tp = BinancePrivateApi.risk_order_params("BTCUSDT", 0.5, "SELL", "LONG", 31000.0, "tp", "MARKET")
+    assert sl["closePosition"] == tp["closePosition"] == "true"
+
+    assert BinancePrivateApi.batch_risk_order_params("BTCUSDT", 0.5, "SELL", "LONG", 29000.0, "sl", "MARKET") is None
+    assert BinancePrivateApi.batch_risk_order_params("BTCUSDT", 0.5, "SELL", "LONG", 31000.0, "tp", "MARKET") is None
+
+
+def test_limit_tp_batch_params():
+    hedge = BinancePrivateApi.batch_risk_order_params("BTCUSDT", -0.5, "SELL", "LONG", 31000.5, "tp", "LIMIT")
+    assert hedge == {
+        "symbol": "BTCUSDT",
+        "side": "SELL",
+        "type": "LIMIT",
+        "quantity": 0.5,
+        "positionSide": "LONG",
+        "price": "31000.5",
+        "timeInForce": "GTC",
+        "recvWindow": 20000,
+        "newOrderRespType": "RESULT",
+    }
+    # reduceOnly только в one-way режиме
+    one_way = BinancePrivateApi.batch_risk_order_params("BTCUSDT", 0.5, "SELL", "BOTH", 31000.5, "tp", "LIMIT")
+    assert one_way["reduceOnly"] == "true"
+    assert "closePosition" not in one_way
+
+
+def test_place_batch_orders_payload():
+    client = BinancePrivateApi(SilentErrorHandler(), api_key="key", api_secret="secret")
+    sent = {}
+
+    async def fake_batch_request(session, method, params, orders, strategy_name, target, symbol):
+        sent.update(method=method, params=params, orders=orders, target=target)
+        return [{"orderId": 1}, {"orderId": 2}]
+
+    client._batch_request = fake_batch_request
+    orders = [
+        BinancePrivateApi.batch_risk_order_params("BTCUSDT", 0.5, "SELL", "BOTH", 31000.5, "tp", "LIMIT"),
+        BinancePrivateApi.batch_risk_order_params("BTCUSDT", 0.25, "SELL", "BOTH", 32000.0, "tp", "LIMIT"),
+    ]
+    responses = asyncio.run(client.place_batch_orders(None, "volf_stoch", "BTCUSDT", orders))
+
+    assert responses == [{"orderId": 1}, {"orderId": 2}]
+    assert sent["method"] == "POST"
+    assert sent["orders"] == 2
+    assert sent["params"]["recvWindow"] == 20000
+    assert json.loads(sent["params"]["batchOrders"]) == [
+        {
+            "symbol": "BTCUSDT", "side": "SELL", "type": "LIMIT", "quantity": "0.5", "positionSide": "BOTH",
+            "price": "31000.5", "timeInForce": "GTC", "newOrderRespType": "RESULT", "reduceOnly": "true",
+        },
+        {
+            "symbol": "BTCUSDT", "side": "SELL", "type": "LIMIT", "quantity": "0.25", "positionSide": "BOTH",
+            "price": "32000.0", "timeInForce": "GTC", "newOrderRespType": "RESULT", "reduceOnly": "true",
+        },
+    ]
@@ -0,0 +1,123 @@
+"""
+Numba-ядра (BUSINESS/kernels.py) против эталонных формул на pandas.
+Эталон переписан по исходникам pandas_ta (ema с presma, rma через
+ewm(alpha=1/length, min_periods=length), stochrsi с non_zero_range и sma);
+с самим пакетом pandas_ta ядра не сверяются -- он больше не зависимость проекта.
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from BUSINESS.indicator_states import StochRsiState, TrendEmaState
+from BUSINESS.kernels import (
+    ema_kernel, rsi_kernel, rolling_max_kernel, rolling_min_kernel, rolling_mean_kernel, stochrsi_kernel
+)
+
+
+# --- эталон: формулы по исходникам pandas_ta ---
+def ref_ema(close: pd.Series, length: int) -> pd.Series:
+    close = close.copy()
+    sma_nth = close[0:length].mean()
+    close[:length - 1] = np.nan
+    close.iloc[length - 1] = sma_nth
+    return close.ewm(span=length, adjust=False).mean()
+
+
+def ref_rma(close: pd.Series, length: int) -> pd.Series:
+    return close.ewm(alpha=1.0 / length, min_periods=length).mean()
+
+
+def ref_rsi(close: pd.Series, length: int = 14) -> pd.Series:
+    negative = close.diff(1)
+    positive = negative.copy()
+    positive[positive < 0] = 0
+    negative[negative > 0] = 0
+    positive_avg = ref_rma(positive, length)
+    negative_avg = ref_rma(negative, length)
+    return 100 * positive_avg / (positive_avg + negative_avg.abs())
+
+
+def ref_stochrsi(close: pd.Series, length: int = 14, rsi_length: int = 14, k: int = 3, d: int = 3):
+    rsi_ = ref_rsi(close, rsi_length)
+    lowest_rsi = rsi_.rolling(length).min()
+    highest_rsi = rsi_.rolling(length).max()
+    spread = highest_rsi - lowest_rsi
+    if spread.eq(0).any():
+        spread += sys.float_info.epsilon
+    stoch = 100 * (rsi_ - lowest_rsi) / spread
+    stochrsi_k = stoch.rolling(k).mean()
+    stochrsi_d = stochrsi_k.rolling(d).mean()
+    return stochrsi_k, stochrsi_d
+
+
+def random_walk(n: int, seed: int) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    return pd.Series(100 + np.cumsum(rng.normal(0, 1, n)))
+
+
+def assert_same(actual: np.ndarray, expected: pd.Series, atol: float = 1e-8):
+    expected = expected.to_numpy(dtype=np.float64)
+    np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected))
+    np.testing.assert_allclose(actual, expected, atol=atol, equal_nan=True)
+
+
+SERIES = [(60, 1), (70, 2), (300, 3)]
+
+
+@pytest.mark.parametrize("n, seed", SERIES)
+@pytest.mark.parametrize("length", [1, 5, 9, 21])
+def test_ema_matches_reference(n, seed, length):
+    close = random_walk(n, seed)
+    assert_same(ema_kernel(close.to_numpy(), length), ref_ema(close, length))
+
+
+@pytest.mark.parametrize("n, seed", SERIES)
+@pytest.mark.parametrize("length", [6, 14])
+def test_rsi_matches_reference(n, seed, length):
+    close = random_walk(n, seed)
+    rsi, _, _ = rsi_kernel(close.to_numpy(), length)
+    assert_same(rsi, ref_rsi(close, length))
+
+
+@pytest.mark.parametrize("n, seed", SERIES)
+@pytest.mark.parametrize("length, k, d", [(14, 3, 3), (10, 5, 2)])
+def test_stochrsi_matches_reference(n, seed, length, k, d):
+    close = random_walk(n, seed)
+    _, _, k_values, d_values, _, _ = stochrsi_kernel(close.to_numpy(), length, k, d, 14)
+    ref_k, ref_d = ref_stochrsi(close, length, 14, k, d)
+    assert_same(k_values, ref_k, atol=1e-6)
+    assert_same(d_values, ref_d, atol=1e-6)
+
+
+@pytest.mark.parametrize("window", [1, 5, 20])
+def test_rolling_windows_match_pandas(window):
+    values = random_walk(120, 4)
+    values.iloc[50] = np.nan
+    array = values.to_numpy()
+    assert_same(rolling_max_kernel(array, window), values.rolling(window).max())
+    assert_same(rolling_min_kernel(array, window), values.rolling(window).min())
+    assert_same(rolling_mean_kernel(array, window), values.rolling(window).mean())
+
+
+def test_streaming_states_match_kernels():
+    """Инкрементальные состояния (INDICATORS_STREAMING) дают те же значения, что и ядра по той же истории."""
+    close = random_walk(200, 5)
+    array = close.to_numpy()
+    _, _, k_values, d_values, _, _ = stochrsi_kernel(array, 14, 3, 3, 14)
+    fast, slow = ref_ema(close, 9).to_numpy(), ref_ema(close, 21).to_numpy()
+
+    stoch_state = StochRsiState(14, 3, 3)
+    trend_state = TrendEmaState(9, 21)
+    stoch_state.seed(array[:100])
+    trend_state.seed(array[:100])
+    for idx in range(100, len(array)):
+        k_peek, d_peek = stoch_state.peek(array[idx])
+        assert trend_state.peek(array[idx]) == np.sign(fast[idx] - slow[idx])
+        k_value, d_value = stoch_state.update(array[idx])
+        trend_state.update(array[idx])
+        assert k_peek == pytest.approx(k_values[idx], abs=1e-6)
+        assert d_peek == pytest.approx(d_values[idx], abs=1e-6)
+        assert (k_value, d_value) == (k_peek, d_peek)
+
@@ -0,0 +1,64 @@
+"""
+Разбор /klines без DataFrame (d_bapi.parse_klines) и план страниц истории (klines_pages_plan).
+"""
+import numpy as np
+
+from d_bapi import BinancePublicApi, KlinesArrays, parse_klines
+
+MINUTE_MS = 60_000
+
+
+def kline(open_time: int, close: float, volume: float = 10.0) -> list:
+    """Строка ответа /klines: open time, OHLCV строками, close time, quote volume, ..."""
+    return [
+        open_time, str(close - 1), str(close + 1), str(close - 2), str(close), str(volume),
+        open_time + MINUTE_MS - 1, str(volume * close), 5, "0", "0", "0"
+    ]
+
+
+def test_parse_klines_columns():
+    page = [kline(i * MINUTE_MS, 100.0 + i) for i in range(3)]
+    arrays = parse_klines([page], with_quote=True)
+    assert arrays.columns == KlinesArrays.OHLCV + ["QuoteVolume"]
+    assert arrays.times.tolist() == [0, MINUTE_MS, 2 * MINUTE_MS]
+    assert arrays.column("Close").tolist() == [100.0, 101.0, 102.0]
+    assert arrays.column("QuoteVolume").tolist() == [1000.0, 1010.0, 1020.0]
+
+    df = arrays.to_dataframe()
+    assert df.index[-1].value // 1_000_000 == 2 * MINUTE_MS
+    assert df["Open"].iloc[0] == 99.0
+
+
+def test_parse_klines_dedups_page_seam():
+    # свеча на стыке пришла в обеих страницах: во второй -- обновлённая версия
+    older = [kline(i * MINUTE_MS, 100.0 + i) for i in range(5)]
+    newer = [kline(4 * MINUTE_MS, 200.0)] + [kline(i * MINUTE_MS, 100.0 + i) for i in range(5, 8)]
+    arrays = parse_klines([older, newer])
+
+    assert arrays.times.tolist() == [i * MINUTE_MS for i in range(8)]
+    assert (np.diff(arrays.times) > 0).all()
+    assert arrays.column("Close")[4] == 200.0
+    assert len(arrays) == 8
+
+
+def test_parse_klines_empty_and_negative_volume():
+    assert parse_klines([]).empty
+    arrays = parse_klines([[kline(0, 100.0, volume=-5.0)]])
+    assert arrays.column("Volume").tolist() == [5.0]
+
+
+def test_klines_pages_plan_covers_limit_without_overlap():
+    end_time = 10_000 * MINUTE_MS
+    plan = BinancePublicApi.klines_pages_plan("1m", 2500, end_time, max_limit=1000)
+
+    assert [page["limit"] for page in plan] == [1000, 1000, 500]
+    assert [page["endTime"] for page in plan] == [end_time, end_time - 1000 * MINUTE_MS, end_time - 2000 * MINUTE_MS]
+    # окна страниц [endTime - (limit - 1) интервалов, endTime] смыкаются без пропусков
+    windows = sorted((page["endTime"] - (page["limit"] - 1) * MINUTE_MS, page["endTime"]) for page in plan)
+    for (_, prev_end), (start, _) in zip(windows, windows[1:]):
+        assert start == prev_end + MINUTE_MS
+
+
+def test_klines_pages_plan_single_page():
+    plan = BinancePublicApi.klines_pages_plan("5m", 300, 123_456_789)
+    assert plan == [{"endTime": 123_456_789, "limit": 300}]
@@ -0,0 +1,102 @@
+"""
+RateLimiter (d_limits): очередь по приоритету при исчерпанном бюджете и блокировка IP по Retry-After.
+"""
+import asyncio
+import time
+import types
+
+from d_limits import (
+    PRIORITY_FILTER, PRIORITY_KLINES, PRIORITY_ORDERS, RateLimiter, TokenBucket, klines_weight
+)
+
+
+def drained_limiter(window: float = 0.1) -> RateLimiter:
+    """Лимитер с коротким окном (быстрое пополнение) и пустым бакетом веса."""
+    limiter = RateLimiter(weight_limit=10)
+    bucket = limiter._ip("direct")["weight_1m"] = TokenBucket(10, window)
+    bucket.take(bucket.capacity)
+    return limiter
+
+
+def test_token_bucket_delay_and_refill():
+    bucket = TokenBucket(10, 1.0, reserve_ratio=0.9)
+    assert bucket.capacity == 9
+    assert bucket.delay(9) == 0.0
+    bucket.take(9)
+    assert 0 < bucket.delay(4.5) <= 0.5
+    bucket.sync_used(9)
+    assert bucket.tokens <= 0.1
+
+
+def test_priority_order_under_drained_bucket():
+    limiter = drained_limiter()
+    order = []
+
+    async def request(name, priority):
+        await limiter.acquire("klines", priority, weight=9)
+        order.append(name)
+
+    async def scenario():
+        # низкоприоритетные пришли раньше, но ордер обслуживается первым
+        tasks = [asyncio.create_task(request("filter", PRIORITY_FILTER))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(request("klines", PRIORITY_KLINES)))
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(request("order", PRIORITY_ORDERS)))
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert order == ["order", "klines", "filter"]
+
+
+def test_equal_priority_is_fifo():
+    limiter = drained_limiter()
+    order = []
+
+    async def request(name):
+        await limiter.acquire("order", PRIORITY_ORDERS, weight=9)
+        order.append(name)
+
+    async def scenario():
+        tasks = []
+        for name in ("first", "second", "third"):
+            tasks.append(asyncio.create_task(request(name)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert order == ["first", "second", "third"]
+
+
+def test_retry_after_blocks_ip():
+    limiter = RateLimiter()
+    response = types.SimpleNamespace(status=429, headers={"Retry-After": "0.3", "X-MBX-USED-WEIGHT-1M": "100"})
+    limiter.update_from_response(response, proxy_url="http://proxy:1")
+
+    assert limiter.blocked_until["http://proxy:1"] > time.monotonic()
+    assert "direct" not in limiter.blocked_until
+
+    async def timed_acquire(proxy_url):
+        start = time.monotonic()
+        await limiter.acquire("ticker/price", PRIORITY_ORDERS, proxy_url)
+        return time.monotonic() - start
+
+    async def scenario():
+        return await timed_acquire(None), await timed_acquire("http://proxy:1")
+
+    # другой IP не заблокирован, заблокированный ждёт Retry-After
+    direct, blocked = asyncio.run(scenario())
+    assert direct < 0.1
+    assert blocked >= 0.25
+
+
+def test_used_weight_header_syncs_bucket():
+    limiter = RateLimiter(weight_limit=2400)
+    response = types.SimpleNamespace(status=200, headers={"X-MBX-USED-WEIGHT-1M": "2000"})
+    limiter.update_from_response(response)
+    bucket = limiter._ip("direct")["weight_1m"]
+    assert bucket.tokens <= bucket.capacity - 2000 + 1
+
+
+def test_klines_weight():
+    assert [klines_weight(limit) for limit in (99, 100, 499, 500, 1000, 1500)] == [1, 2, 2, 5, 5, 10]
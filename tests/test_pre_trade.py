@@ -0,0 +1,89 @@
+"""
+PreTradeValidator (c_validators): подгонка qty под stepSize, цены под tickSize и отказ по minNotional.
+"""
+import types
+
+import pytest
+
+from c_utils import SymbolSpec
+from c_validators import PreTradeValidator
+
+
+class SilentErrorHandler:
+    def wrap_foreign_methods(self, obj):
+        pass
+
+    def debug_error_notes(self, *args, **kwargs):
+        pass
+
+    def debug_info_notes(self, *args, **kwargs):
+        pass
+
+
+SPEC = SymbolSpec(
+    step_size=0.001, tick_size=0.1, min_qty=0.001, max_qty=1000.0, market_max_qty=120.0,
+    min_notional=5.0, qty_precision=3, price_precision=1, status="TRADING"
+)
+
+
+@pytest.fixture
+def validator():
+    context = types.SimpleNamespace(symbol_specs={"BTCUSDT": SPEC, "HALTUSDT": SPEC._replace(status="BREAK")})
+    return PreTradeValidator(context, SilentErrorHandler())
+
+
+def test_market_qty_rounded_down_to_step(validator):
+    assert validator.check_market_order("BTCUSDT", 0.12345, 30000.0, False) == pytest.approx(0.123)
+    assert validator.adjusted == 1
+    # уже кратное шагу -- без изменений
+    assert validator.check_market_order("BTCUSDT", 0.5, 30000.0, False) == 0.5
+    assert validator.adjusted == 1
+
+
+def test_market_qty_capped_by_market_max_qty(validator):
+    assert validator.check_market_order("BTCUSDT", 500.0, 10.0, False) == 120.0
+
+
+def test_min_qty_and_min_notional_rejected(validator):
+    assert validator.check_market_order("BTCUSDT", 0.0004, 30000.0, False) is None
+    # 0.001 * 1000 = 1 USDT < minNotional 5
+    assert validator.check_market_order("BTCUSDT", 0.001, 1000.0, False) is None
+    assert validator.saved_round_trips == 2
+
+
+def test_closing_order_ignores_min_notional(validator):
+    assert validator.check_market_order("BTCUSDT", 0.001, 1000.0, True) == 0.001
+
+
+def test_symbol_not_trading_rejected(validator):
+    assert validator.check_market_order("HALTUSDT", 1.0, 100.0, False) is None
+
+
+def test_unknown_symbol_passes_through(validator):
+    assert validator.check_market_order("NEWUSDT", 0.12345, 1.0, False) == 0.12345
+    assert validator.check_risk_order("NEWUSDT", 0.12345, 1.23456, True) == (0.12345, 1.23456)
+
+
+def test_risk_price_rounded_to_tick(validator):
+    qty, price = validator.check_risk_order("BTCUSDT", 0.5, 30000.06, False)
+    assert (qty, price) == (0.5, pytest.approx(30000.1))
+    qty, price = validator.check_risk_order("BTCUSDT", 0.5, 30000.04, False)
+    assert price == pytest.approx(30000.0)
+
+
+def test_limit_risk_order_rounds_qty(validator):
+    qty, price = validator.check_risk_order("BTCUSDT", 0.12345, 30000.06, True)
+    assert qty == pytest.approx(0.123)
+    assert price == pytest.approx(30000.1)
+
+
+def test_risk_order_without_price_rejected(validator):
+    assert validator.check_risk_order("BTCUSDT", 0.5, 0.0, True) is None
+
+
+def test_limit_risk_order_capped_by_lot_size(validator):
+    # лимитный TP ограничен LOT_SIZE.maxQty, а не MARKET_LOT_SIZE.maxQty
+    qty, _ = validator.check_risk_order("BTCUSDT", 500.0, 30000.0, True)
+    assert qty == 500.0
+    qty, _ = validator.check_risk_order("BTCUSDT", 5000.0, 30000.0, True)
+    assert qty == 1000.0
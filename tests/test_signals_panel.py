@@ -0,0 +1,115 @@
+"""
+Панельный расчёт SIGNALS.evaluate_panel должен давать то же, что и поштучные
+trend_ema_calc / stochrsi_calc / volf_calc по тому же кадру свечей, независимо от того,
+попал ли символ в панель (общая сетка времени) или считается отдельно.
+"""
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from BUSINESS.signals import SIGNALS, freeze_params
+
+KLINES_LIM = 70
+TFR = "5m"
+
+RULES = {
+    "TREND_EMA": {"enable": True, "tfr": TFR, "period1": 9, "period2": 21, "col_name": "Close", "ind_name": "TREND_EMA"},
+    "STOCHRSI": {"enable": True, "tfr": TFR, "period": 14, "k": 3, "d": 3, "over_buy": 60, "over_sell": 40, "ind_name": "STOCHRSI"},
+    "VOLF_A": {"enable": True, "tfr": TFR, "period": 5, "mode": "a", "a": {"slice_factor": 0.9}, "ind_name": "VOLF"},
+    "VOLF_R": {"enable": True, "tfr": TFR, "period": 8, "mode": "r", "r": {"slice_factor": 1.2}, "ind_name": "VOLF"},
+}
+
+
+class SilentErrorHandler:
+    def wrap_foreign_methods(self, obj):
+        pass
+
+    def debug_error_notes(self, *args, **kwargs):
+        pass
+
+    def debug_info_notes(self, *args, **kwargs):
+        pass
+
+
+def make_frame(rng, index) -> pd.DataFrame:
+    close = 100 + np.cumsum(rng.normal(0, 1, len(index)))
+    noise = rng.random((len(index), 3))
+    volume = rng.random(len(index)) * 100
+    return pd.DataFrame(
+        np.column_stack([close + noise[:, 0], close + 1 + noise[:, 1], close - 1 - noise[:, 2], close, volume]),
+        columns=["Open", "High", "Low", "Close", "Volume"], index=index
+    )
+
+
+@pytest.fixture
+def signals():
+    side = {"entry_conditions": {"rules": RULES}}
+    context = types.SimpleNamespace(
+        strategy_notes={"volf_stoch": {"LONG": side, "SHORT": side}},
+        ukik_suffics_data={"klines_lim": KLINES_LIM},
+        klines_data_cache={},
+    )
+    rng = np.random.default_rng(7)
+    index = pd.date_range("2024-01-01", periods=KLINES_LIM, freq="5min")
+    for num in range(40):
+        context.klines_data_cache[f"S{num}_{KLINES_LIM}_{TFR}"] = make_frame(rng, index)
+    # отдельная сетка времени -- символ не попадает в общую панель
+    context.klines_data_cache[f"LONE_{KLINES_LIM}_{TFR}"] = make_frame(rng, index + pd.Timedelta("5min"))
+    return SIGNALS(context, SilentErrorHandler(), None)
+
+
+def per_symbol_values(signals, symbol):
+    df = signals.extract_df(symbol, TFR)
+    values = {}
+    for ind_rules in RULES.values():
+        ind_name = ind_rules["ind_name"].lower()
+        calc = getattr(signals, f"{ind_name}_calc")
+        values[(ind_name, freeze_params(ind_rules))] = calc(df, ind_rules, stream_key=f"{symbol}_{TFR}").iloc[-1]
+    return values
+
+
+def test_panel_matches_per_symbol(signals):
+    symbols = [f"S{num}" for num in range(40)] + ["LONE"]
+    signals.evaluate_panel(symbols)
+
+    for symbol in symbols:
+        memo = signals.ind_memo.get(f"{symbol}_{TFR}")
+        expected = per_symbol_values(signals, symbol)
+        if symbol == "LONE":
+            assert memo is None
+            continue
+        assert memo is not None
+        panel_values = {key: series.iloc[-1] for key, series in memo[1].items()}
+        assert panel_values == expected, symbol
+
+
+def test_memo_lookup_returns_panel_result(signals):
+    signals.evaluate_panel(["S0", "S1"])
+    df = signals.extract_df("S0", TFR)
+    ind_rules = RULES["STOCHRSI"]
+
+    def fail(*args, **kwargs):
+        raise AssertionError("после панели индикатор не должен пересчитываться")
+
+    result = signals.memo_indicator(fail, "stochrsi", df, ind_rules, f"S0_{TFR}")
+    assert result.iloc[-1] == signals.stochrsi_calc(df, ind_rules).iloc[-1]
+
+
+def test_streaming_mode_keeps_stateful_indicators_out_of_panel(signals):
+    signals.streaming = True
+    specs = signals.panel_specs()[TFR]
+    assert {ind_name for ind_name, _ in specs.values()} == {"volf"}
+
+
+def test_volf_uses_last_closed_bar(signals):
+    # формирующийся бар с нулевым объёмом (WS-путь) не гасит всплеск на закрытом баре
+    df = signals.extract_df("S0", TFR).copy()
+    df.iloc[-2, df.columns.get_loc("Volume")] = 1e6
+    df.iloc[-1, df.columns.get_loc("Volume")] = 0.0
+    assert bool(signals.volf_calc(df, RULES["VOLF_A"]).iloc[-1])
+
+    df.iloc[-2, df.columns.get_loc("Volume")] = 0.0
+    df.iloc[-1, df.columns.get_loc("Volume")] = 1e6
+    assert not bool(signals.volf_calc(df, RULES["VOLF_A"]).iloc[-1])